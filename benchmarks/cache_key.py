@@ -0,0 +1,66 @@
+"""
+Compares the cost of deriving a callback cache key from the store data using:
+
+    - to_hashable: recursively converting the data to frozendict/tuples (then hashing it).
+    - get_cache_key: hashing the canonical orjson serialization to a digest.
+
+Usage: python benchmarks/cache_key.py [n_nodes ...]
+"""
+import sys
+import timeit
+
+from frozendict import frozendict
+
+from indizio.models.network.parameters import NetworkParamThreshold
+from indizio.store.network.interaction import NetworkInteractionStoreModel
+from indizio.store.network.parameters import NetworkFormStoreModel
+from indizio.util.cache import get_cache_key
+
+
+def to_hashable(obj):
+    """
+    Serializes a nested dictionary to a frozendict for memoization.
+    """
+    if isinstance(obj, dict):
+        return frozendict((k, to_hashable(v)) for k, v in obj.items())
+    if isinstance(obj, list) or isinstance(obj, tuple):
+        return tuple(to_hashable(x) for x in obj)
+    return obj
+
+
+def create_store_data(n_nodes: int):
+    """
+    Create the data of the stores used as callback arguments, where n_nodes
+    are visible/selected in the network interaction store.
+    """
+    nodes = [f'node_{i}' for i in range(n_nodes)]
+    interaction = NetworkInteractionStoreModel(
+        nodes_selected=set(nodes[:n_nodes // 10]),
+        nodes_visible=set(nodes),
+    )
+    params = NetworkFormStoreModel(
+        node_of_interest=nodes[:10],
+        thresholds={
+            f'matrix_{i}': NetworkParamThreshold(file_id=f'matrix_{i}', left_value=0.5, right_value=1.0)
+            for i in range(5)
+        }
+    )
+    return {
+        'state_interaction': interaction.model_dump(mode='json'),
+        'state_params': params.model_dump(mode='json'),
+    }
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [100, 1_000, 10_000, 100_000]
+    print(f'{"n_nodes":>10}  {"to_hashable (ms)":>18}  {"get_cache_key (ms)":>20}  {"speedup":>8}')
+    for n_nodes in sizes:
+        data = create_store_data(n_nodes)
+        n_repeat = max(1, 100_000 // n_nodes)
+        t_hashable = min(timeit.repeat(lambda: hash(to_hashable(data)), number=n_repeat, repeat=5)) / n_repeat
+        t_digest = min(timeit.repeat(lambda: get_cache_key(data), number=n_repeat, repeat=5)) / n_repeat
+        print(f'{n_nodes:>10,}  {t_hashable * 1000:>18.3f}  {t_digest * 1000:>20.3f}  {t_hashable / t_digest:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
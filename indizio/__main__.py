@@ -13,9 +13,13 @@ from indizio import __version__
 from indizio.components.layout.message import LayoutMessage
 from indizio.components.layout.navbar import NavBar
 from indizio.components.layout.reload import LayoutReload
-from indizio.config import TMP_DIR
+from indizio.config import TMP_DIR, MODEL_CACHE_MAX_BYTES, TMP_DIR_MAX_BYTES, \
+    GRAPH_CACHE_MAX_BYTES, CALLBACK_CACHE_MAX_BYTES, CALLBACK_CACHE_DIR
 from indizio.models.common.logging import LogLevel
 from indizio.store.active_stores import ACTIVE_STORES
+from indizio.util.cache import DISK_CACHE, trim_tmp_dir, GRAPH_CACHE, clean_graph_cache, get_disk_cache_stats, \
+    CALLBACK_CACHE
+from indizio.util.files import MODEL_CACHE
 from indizio.util.log import hide_logs
 from indizio.util.log import log
 
@@ -31,7 +35,13 @@ def main(
         logging: Optional[LogLevel] = LogLevel.INFO,
         debug: bool = False,
         port: int = 9001,
-        host: str = 'localhost'
+        host: str = 'localhost',
+        memory_cache_mb: int = MODEL_CACHE_MAX_BYTES // 1024 // 1024,
+        persist_cache: bool = True,
+        disk_cache_mb: int = TMP_DIR_MAX_BYTES // 1024 // 1024,
+        graph_cache_mb: int = GRAPH_CACHE_MAX_BYTES // 1024 // 1024,
+        callback_cache_mb: int = CALLBACK_CACHE_MAX_BYTES // 1024 // 1024,
+        share_callback_cache: bool = False
 ):
     # Hide non-critical messages from third-party packages
     try:
@@ -47,9 +57,23 @@ def main(
     # Create the temporary directory used by Indizio for storing files
     TMP_DIR.mkdir(exist_ok=True)
 
+    # Set the maximum size of files that are kept in memory after being read
+    MODEL_CACHE.set_max_bytes(memory_cache_mb * 1024 * 1024)
+
+    # Remove the least recently used files from previous sessions if over the limit
+    DISK_CACHE.reset('size_limit', disk_cache_mb * 1024 * 1024)
+    trim_tmp_dir(disk_cache_mb * 1024 * 1024)
+    clean_graph_cache(graph_cache_mb * 1024 * 1024)
+
+    # Set the maximum size of the memoized callback results (e.g. figures)
+    if share_callback_cache:
+        CALLBACK_CACHE.enable_sharing(CALLBACK_CACHE_DIR)
+    CALLBACK_CACHE.set_max_bytes(callback_cache_mb * 1024 * 1024)
+
     try:
         log(f'Indizio [bold blue]v{__version__}[/bold blue]')
         log(f'Writing temporary files to: {TMP_DIR.as_posix()}', level=LogLevel.DEBUG)
+        log(f'Graph cache: {get_disk_cache_stats(GRAPH_CACHE)}', level=LogLevel.DEBUG)
 
         with Progress(
                 SpinnerColumn(),
@@ -100,9 +124,13 @@ def main(
     finally:
         if debug:
             log(f'Temporary files are not removed in debug mode: {TMP_DIR.as_posix()}')
+        elif persist_cache:
+            log(f'Cached files are kept for the next session: {TMP_DIR.as_posix()}', level=LogLevel.DEBUG)
         else:
             log('Cleaning up temporary files.', level=LogLevel.DEBUG)
             try:
+                DISK_CACHE.close()
+                GRAPH_CACHE.close()
                 shutil.rmtree(TMP_DIR.as_posix())
             except Exception as e:
                 log(f'Unable to remove temporary files: {e}', level=LogLevel.ERROR)
@@ -0,0 +1,45 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    network: {
+        /**
+         * Apply the difference computed on the server to the elements of the
+         * cytoscape graph, this avoids sending every element for each change.
+         * The delta either contains all elements, or those to remove/add/update.
+         */
+        apply_elements_delta: function (delta, elements) {
+            if (!delta) {
+                return window.dash_clientside.no_update;
+            }
+            if (delta.elements) {
+                return delta.elements;
+            }
+
+            // The elements can either be a dict or list
+            let current = elements || [];
+            if (!Array.isArray(current)) {
+                current = (current.nodes || []).concat(current.edges || []);
+            }
+
+            const remove = new Set(delta.remove);
+            const out = [];
+            for (const element of current) {
+                const elementId = element.data.id;
+                if (remove.has(elementId)) {
+                    continue;
+                }
+                const update = delta.update[elementId];
+                if (update) {
+                    const data = Object.assign({}, element.data, update);
+                    for (const [key, value] of Object.entries(update)) {
+                        if (value === null) {
+                            delete data[key];
+                        }
+                    }
+                    out.push(Object.assign({}, element, {data: data}));
+                } else {
+                    out.push(element);
+                }
+            }
+            return out.concat(delta.add);
+        }
+    }
+});
@@ -0,0 +1,14 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    upload: {
+        /**
+         * Create a unique token each time the files are processed, this is
+         * used to key the progress of that upload on the server.
+         */
+        new_progress_token: function (n_clicks) {
+            if (!n_clicks) {
+                return window.dash_clientside.no_update;
+            }
+            return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+        }
+    }
+});
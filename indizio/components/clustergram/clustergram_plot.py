@@ -1,24 +1,24 @@
-from functools import lru_cache
 from typing import Optional
 
-import dash_bio
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from dash import Output, Input, callback, State, dcc
 from plotly.subplots import make_subplots
 
-from indizio.config import GRAPH_AXIS_FONT_SIZE
+from indizio.config import GRAPH_AXIS_FONT_SIZE, CLUSTERGRAM_OPTIMAL_LEAF_ORDER_MAX_LEAVES
+from indizio.models.clustergram.clustering import HierarchicalClustering, ClusterAxis, LEAF_SPACING, LeafOrdering
 from indizio.models.common.boolean import BooleanYesNo
 from indizio.models.common.sync_with_network import SyncWithNetwork
 from indizio.models.metadata.metadata_column import MetadataColumn
+from indizio.models.tree.tree_array import TreeArray
 from indizio.store.clustergram.legend import ClustergramLegendStore, ClustergramLegendStoreModel
 from indizio.store.clustergram.parameters import ClustergramParametersStore, ClustergramParametersStoreModel
 from indizio.store.metadata_file import MetadataFileStore, MetadataFileStoreModel
 from indizio.store.network.interaction import NetworkInteractionStore, NetworkInteractionStoreModel
 from indizio.store.presence_absence import PresenceAbsenceStore, PresenceAbsenceStoreModel
 from indizio.store.tree_file import TreeFileStore, TreeFileStoreModel
-from indizio.util.cache import freezeargs
+from indizio.util.cache import memoize_callback
 from indizio.util.data import normalize
 from indizio.util.graph import format_axis_labels
 from indizio.util.log import log_debug
@@ -69,8 +69,7 @@ class ClustergramPlot(dcc.Loading):
                 state_legend=State(ClustergramLegendStore.ID, "data"),
             ),
         )
-        @freezeargs
-        @lru_cache
+        @memoize_callback()
         def update_options_on_file_upload(
                 ts_params, ts_dm, ts_tree, ts_meta, ts_interaction, ts_legend,
                 state_params, state_dm, state_tree, state_meta, state_interaction,
@@ -83,7 +82,7 @@ class ClustergramPlot(dcc.Loading):
             params = ClustergramParametersStoreModel(**state_params)
             state_tree = TreeFileStoreModel(**state_tree)
             state_meta = MetadataFileStoreModel(**state_meta)
-            state_interaction = NetworkInteractionStoreModel(**state_interaction)
+            state_interaction = NetworkInteractionStoreModel.load(state_interaction)
             state_legend = ClustergramLegendStoreModel(**state_legend)
 
             # Load the distance matrix based on what was used to generate the graph
@@ -102,17 +101,17 @@ class ClustergramPlot(dcc.Loading):
 
             # If the metric is not set from the parameters, choose the first one
             if params.metric is None:
-                feature_df = state_dm.get_files()[0].read()
+                pa_file = state_dm.get_files()[0]
             else:
-                feature_df = state_dm.get_file(params.metric).read()
+                pa_file = state_dm.get_file(params.metric)
 
-            # Subset the data visible if requested
+            # Subset the data visible if requested (only those values are read)
             if params.sync_with_network is SyncWithNetwork.VISIBLE and len(state_interaction.nodes_visible) > 0:
-                subset_cols = [x for x in feature_df.columns if x in state_interaction.nodes_visible]
-                feature_df = feature_df[subset_cols]
+                feature_df = pa_file.read_subset(cols=state_interaction.nodes_visible)
             elif params.sync_with_network is SyncWithNetwork.SELECTED and len(state_interaction.nodes_selected) > 0:
-                subset_cols = [x for x in feature_df.columns if x in state_interaction.nodes_selected]
-                feature_df = feature_df[subset_cols]
+                feature_df = pa_file.read_subset(cols=state_interaction.nodes_selected)
+            else:
+                feature_df = pa_file.read()
 
             # To prevent an error on only one column visible, do not cluster
             if len(feature_df.columns) < 2:
@@ -120,17 +119,17 @@ class ClustergramPlot(dcc.Loading):
             else:
                 cluster_features = params.cluster_on.is_features()
 
-            # Generate the Clustergram using DashBio and return the traces
+            # Cluster the features and return the traces (the clustering is cached)
             feature_df, cg_traces, dendro_traces = generate_clustergram(
                 feature_df=feature_df,
+                matrix_hash=pa_file.hash,
                 tree=tree,
                 optimal_leaf_ordering=params.optimal_leaf_order is BooleanYesNo.YES,
                 cluster_features=cluster_features,
                 cluster_ids=params.cluster_on.is_identifiers(),
             )
 
-            # Using the DashBio data, create our own Clustergram figure
-            # as the DashBio doesn't allow for multiple colour grouping (meta)
+            # Create the Clustergram figure, this allows for multiple colour grouping (meta)
             fig = generate_annotation_heatmap(feature_df, cg_traces, df_meta, params, dendro_traces, state_legend)
 
             fig.update_xaxes(tickangle=45, tickfont=dict(size=GRAPH_AXIS_FONT_SIZE))
@@ -143,65 +142,67 @@ class ClustergramPlot(dcc.Loading):
 
 def generate_clustergram(
         feature_df: pd.DataFrame,
-        tree: Optional[TreeFileStoreModel],
+        matrix_hash: str,
+        tree: Optional[TreeArray],
         optimal_leaf_ordering: bool,
         cluster_features: bool,
-        cluster_ids: bool
+        cluster_ids: bool,
+        max_optimal_leaves: int = CLUSTERGRAM_OPTIMAL_LEAF_ORDER_MAX_LEAVES
 ):
     """
-    Helper function to generate the clustergram and return the traces.
+    Helper function to cluster the features (columns) and return the traces.
+    The linkage and leaf order are cached for the matrix and labels clustered.
+    The optimal leaf ordering is approximated for more than max_optimal_leaves.
     """
 
-    # Determine what type of clustering based on the input argument
-    # Note this is a bit of legacy code left over from the original implementation
-    # Later on in the program, the dendrogram will be displayed if requested
-    if cluster_features and cluster_ids:
-        cluster_arg = 'col'
-    elif cluster_features:
-        cluster_arg = 'col'
-    elif cluster_ids:
-        cluster_arg = None
-    else:
-        cluster_arg = None
-
     # If a tree has been provided then subset both the matrix and tree
     # to only those present in both and compute the distance matrix
     tree_taxa_ordered = None
     if tree is not None and cluster_ids:
-        # Get the order of the leaf nodes (postorder)
-        tree_taxa_ordered = [x.taxon.label for x in tree.leaf_node_iter()]
+        # Get the order of the leaf nodes (left to right)
+        tree_taxa_ordered = tree.get_leaf_labels()
 
         # Subset feature dataframe to only those those present in the tree
         common_taxa = set(tree_taxa_ordered).intersection(set(feature_df.index))
         common_taxa = [x for x in feature_df.index if x in common_taxa]
-        tree = tree.extract_tree_with_taxa_labels(common_taxa)
+        tree = tree.extract_tree_with_labels(common_taxa)
         feature_df = feature_df.filter(items=common_taxa, axis=0)
 
         # Order the Y axis values of the feature dataframe to match the tree
-        tree_taxa_ordered = [x.taxon.label for x in tree.leaf_node_iter()]
+        tree_taxa_ordered = tree.get_leaf_labels()
         feature_df = feature_df.loc[tree_taxa_ordered]
 
-    # Compute the clustergram
-    clustergram, traces = dash_bio.Clustergram(
-        data=feature_df.values,
-        row_labels=feature_df.index.to_list(),
-        column_labels=feature_df.columns.to_list(),
-        optimal_leaf_order=optimal_leaf_ordering,
-        link_fun=None,
-        # dist_fun=dist_fun,
-        # row_dist='euclidean', #  if not tree else 'row_dist'
-        # col_dist='euclidean',
-        cluster=cluster_arg,
-        # hidden_labels='row',
-        # height=900,
-        # width=1100,
-        color_map=[
-            [0.0, '#FFFFFF'],
-            [1.0, '#EF553B']
-        ],
-        return_computed_traces=True,
-        line_width=2.0,
-    )
+    # The identifiers (rows) are ordered by the tree, only the features are clustered
+    row_ids = list(range(feature_df.shape[0]))
+    y_pos = [LEAF_SPACING * i + LEAF_SPACING // 2 for i in row_ids]
+    if cluster_features:
+        if not optimal_leaf_ordering:
+            leaf_ordering = LeafOrdering.DEFAULT
+        elif feature_df.shape[1] > max_optimal_leaves:
+            leaf_ordering = LeafOrdering.FAST
+        else:
+            leaf_ordering = LeafOrdering.OPTIMAL
+        clustering = HierarchicalClustering.from_matrix(
+            data=feature_df.values,
+            matrix_hash=matrix_hash,
+            labels=(feature_df.index.to_list(), feature_df.columns.to_list()),
+            axis=ClusterAxis.COLUMNS,
+            leaf_ordering=leaf_ordering,
+        )
+        column_ids = clustering.leaves
+        x_pos = clustering.get_leaf_positions()
+        dendro_col = clustering.get_dendrogram_traces()
+    else:
+        column_ids = list(range(feature_df.shape[1]))
+        x_pos = [LEAF_SPACING * i + LEAF_SPACING // 2 for i in column_ids]
+        dendro_col = list()
+
+    traces = {
+        'heatmap': {'x': x_pos, 'y': y_pos, 'z': feature_df.values[:, column_ids]},
+        'row_ids': row_ids,
+        'column_ids': column_ids,
+        'dendro_traces': {'col': dendro_col, 'row': list()},
+    }
 
     # Now that we have the positional information from the clustergram,
     # we generate the dendrogram (if requested)
@@ -295,9 +296,9 @@ def generate_annotation_heatmap(
         xy_labels_full.append(cur_vals)
 
     main_heatmap = go.Heatmap(
-        x=cg_traces['heatmap'].x,
-        y=cg_traces['heatmap'].y,
-        z=cg_traces['heatmap'].z,
+        x=cg_traces['heatmap']['x'],
+        y=cg_traces['heatmap']['y'],
+        z=cg_traces['heatmap']['z'],
         colorscale=((0.0, 'rgba(0,0,0,0)'), (1.0, '#EF553B')),
         showscale=False,
         xgap=1,
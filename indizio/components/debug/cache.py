@@ -0,0 +1,63 @@
+import dash_bootstrap_components as dbc
+from dash import callback, Output, Input, html, dcc
+
+from indizio.util.cache import DISK_CACHE, GRAPH_CACHE, get_disk_cache_stats, CALLBACK_CACHE
+from indizio.util.files import MODEL_CACHE
+
+
+class DebugCacheStats(dbc.Card):
+    """
+    This component displays the size and hit rate of each server-side cache.
+    """
+
+    ID = 'debug-cache-stats'
+    ID_INTERVAL = f'{ID}-interval'
+    INTERVAL_MS = 5000
+
+    def __init__(self):
+        super().__init__(
+            style={'marginBottom': '10px'},
+            children=[
+                dbc.CardHeader(html.B('Server caches')),
+                dbc.CardBody(
+                    children=[
+                        html.Div(id=self.ID),
+                        dcc.Interval(id=self.ID_INTERVAL, interval=self.INTERVAL_MS),
+                    ]
+                )
+            ]
+        )
+
+        @callback(
+            output=dict(
+                out=Output(self.ID, "children"),
+            ),
+            inputs=dict(
+                n_intervals=Input(self.ID_INTERVAL, "n_intervals"),
+            )
+        )
+        def update_cache_stats(n_intervals):
+            d_name_to_stats = {
+                'Models (memory)': MODEL_CACHE.stats(),
+                'Artifacts (disk)': get_disk_cache_stats(DISK_CACHE),
+                'Filtered graphs (disk)': get_disk_cache_stats(GRAPH_CACHE),
+                'Callback results (memory)': CALLBACK_CACHE.stats(),
+            }
+            rows = list()
+            for name, stats in d_name_to_stats.items():
+                n_requests = stats['hits'] + stats['misses']
+                rows.append(html.Tr([
+                    html.Td(name),
+                    html.Td(f'{stats["items"]:,}'),
+                    html.Td(f'{stats["bytes"] / 1024 / 1024:,.2f} / {stats["max_bytes"] / 1024 / 1024:,.0f} MB'),
+                    html.Td(f'{stats["hits"] / n_requests:.1%}' if n_requests > 0 else '-'),
+                ]))
+            return dict(
+                out=dbc.Table(
+                    size='sm',
+                    children=[
+                        html.Thead(html.Tr([html.Th(x) for x in ('Cache', 'Items', 'Size', 'Hit rate')])),
+                        html.Tbody(rows),
+                    ]
+                )
+            )
@@ -1,5 +1,6 @@
 from dash import html
 
+from indizio.components.debug.cache import DebugCacheStats
 from indizio.components.debug.store import DebugStore
 from indizio.store.active_stores import ACTIVE_STORES
 
@@ -8,6 +9,9 @@ class DebugContainer(html.Div):
 
     def __init__(self):
         super().__init__(
-            children=[DebugStore(x.ID) for x in ACTIVE_STORES]
+            children=[
+                DebugCacheStats(),
+                *[DebugStore(x.ID) for x in ACTIVE_STORES]
+            ]
         )
 
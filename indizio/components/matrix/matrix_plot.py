@@ -1,5 +1,4 @@
 import time
-from functools import lru_cache
 
 import numpy as np
 import plotly.graph_objects as go
@@ -11,7 +10,7 @@ from indizio.models.common.sync_with_network import SyncWithNetwork
 from indizio.store.matrix.dm_files import DistanceMatrixStore, DistanceMatrixStoreModel
 from indizio.store.matrix.parameters import MatrixParametersStore, MatrixParametersStoreModel
 from indizio.store.network.interaction import NetworkInteractionStore, NetworkInteractionStoreModel
-from indizio.util.cache import freezeargs
+from indizio.util.cache import memoize_callback
 from indizio.util.graph import format_axis_labels
 from indizio.util.log import log_debug, pretty_fmt_seconds
 from indizio.util.plot import get_color
@@ -53,8 +52,7 @@ class MatrixPlot(dcc.Loading):
                 state_interaction=State(NetworkInteractionStore.ID, "data")
             )
         )
-        @freezeargs
-        @lru_cache
+        @memoize_callback()
         def update_options_on_file_upload(ts_params, ts_dm, ts_interaction, state_params, state_dm, state_interaction):
             log_debug(f'{self.ID} - Updating matrix heatmap figure.')
 
@@ -68,21 +66,23 @@ class MatrixPlot(dcc.Loading):
             # De-serialize the distance matrix store
             state_dm = DistanceMatrixStoreModel(**state_dm)
             params = MatrixParametersStoreModel(**state_params)
-            state_interaction = NetworkInteractionStoreModel(**state_interaction)
+            state_interaction = NetworkInteractionStoreModel.load(state_interaction)
 
             # If the metric is not set from the parameters, choose the first one
             if params.metric is None:
-                feature_df = state_dm.get_files()[0].read()
+                dm_file = state_dm.get_files()[0]
             else:
-                feature_df = state_dm.get_file(params.metric).read()
+                dm_file = state_dm.get_file(params.metric)
 
-            # Subset the data visible if requested
+            # Subset the data visible if requested (only those values are read)
             if params.sync_with_network is SyncWithNetwork.VISIBLE and len(state_interaction.nodes_visible) > 0:
-                subset_cols = [x for x in feature_df.columns if x in state_interaction.nodes_visible]
-                feature_df = feature_df.loc[subset_cols, subset_cols]
+                nodes = state_interaction.nodes_visible
+                feature_df = dm_file.read_subset(rows=nodes, cols=nodes)
             elif params.sync_with_network is SyncWithNetwork.SELECTED and len(state_interaction.nodes_selected) > 0:
-                subset_cols = [x for x in feature_df.columns if x in state_interaction.nodes_selected]
-                feature_df = feature_df.loc[subset_cols, subset_cols]
+                nodes = state_interaction.nodes_selected
+                feature_df = dm_file.read_subset(rows=nodes, cols=nodes)
+            else:
+                feature_df = dm_file.read()
 
             # if dataset in meta_dict.keys():
             #     meta_df = meta_dict[dataset]
@@ -5,6 +5,7 @@ from indizio.components.network.btn_deselect import NetworkBtnDeselect
 from indizio.components.network.btn_dl_graphml import DownloadGraphMlButton
 from indizio.components.network.filtering_applied import NetworkVizFilteringApplied
 from indizio.components.network.network_graph import NetworkVizGraph
+from indizio.components.network.network_webgl import NetworkVizWebGl
 from indizio.components.network.node_edge_count import NetworkVizEdgeCount, NetworkVizNodeCount
 from indizio.components.network.parameters import NetworkFormParameters
 from indizio.components.network.reset_view import NetworkVizResetView
@@ -44,7 +45,8 @@ class NetworkVizContainer(dbc.Card):
 
                 ]),
                 dbc.CardBody([
-                    NetworkVizGraph()
+                    NetworkVizGraph(),
+                    NetworkVizWebGl(),
                 ],
                     className='p-0'
                 )
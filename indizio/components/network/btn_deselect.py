@@ -38,11 +38,7 @@ class NetworkBtnDeselect(html.Div):
             if not n_clicks:
                 raise PreventUpdate
 
-            # De-serialize the states
-            state = NetworkInteractionStoreModel(**interaction_state)
-            state.deselect_nodes()
-
             # Return the data
             return dict(
-                interaction_state=state.model_dump(mode='json')
+                interaction_state=NetworkInteractionStoreModel.update(interaction_state, lambda x: x.deselect_nodes())
             )
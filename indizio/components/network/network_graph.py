@@ -1,14 +1,16 @@
-from typing import Optional
+from typing import Optional, List
 
 import dash_cytoscape as cyto
 import plotly.express as px
-from dash import Output, Input, callback, State, dcc
+from dash import Output, Input, callback, State, dcc, clientside_callback, ClientsideFunction, no_update
 from dash.exceptions import PreventUpdate
 
 from indizio.config import ID_NETWORK_VIZ_EDGE_COUNT, ID_NETWORK_VIZ_NODE_COUNT, ID_NETWORK_VIZ_FILTERING_APPLIED
-from indizio.models.network.parameters import EdgeWeights, NetworkParamNodeColor, NetworkParamNodeSize
+from indizio.models.network.edge_table import EdgeTable
+from indizio.models.network.parameters import EdgeWeights, NetworkParamNodeColor, NetworkParamNodeSize, NetworkRenderer
 from indizio.models.network.stylesheet import NetworkVizStyleSheet
 from indizio.store.metadata_file import MetadataFileStore, MetadataFileStoreModel
+from indizio.store.network.elements import NetworkElementsStore, NetworkElementsStoreModel
 from indizio.store.network.graph import DistanceMatrixGraphStore, DistanceMatrixGraphStoreModel
 from indizio.store.network.interaction import NetworkInteractionStoreModel, NetworkInteractionStore
 from indizio.store.network.parameters import NetworkFormStore, NetworkFormStoreModel
@@ -20,10 +22,15 @@ from indizio.util.plot import numerical_colorscale
 class NetworkVizGraph(dcc.Loading):
     """
     The cytoscape network graph component.
+
+    The elements are not sent directly to the graph, instead the difference
+    to the previous render is written to the delta store, and applied to the
+    graph in the browser.
     """
     ID = 'network-viz-graph'
     ID_GRAPH = f'{ID}-cytoscape'
     ID_LOADING = f'{ID}-loading'
+    ID_DELTA = f'{ID}-delta'
 
     def __init__(self):
         super().__init__(
@@ -36,13 +43,24 @@ class NetworkVizGraph(dcc.Loading):
                     style={'width': '100%', 'height': 'calc(100vh - 210px)'},
                     responsive=True,
                     stylesheet=NetworkVizStyleSheet().export()
-                )
+                ),
+                dcc.Store(id=self.ID_DELTA, storage_type='memory'),
+                NetworkElementsStore(),
             ],
         )
 
+        clientside_callback(
+            ClientsideFunction(namespace='network', function_name='apply_elements_delta'),
+            Output(self.ID_GRAPH, 'elements'),
+            Input(self.ID_DELTA, 'data'),
+            State(self.ID_GRAPH, 'elements'),
+            prevent_initial_call=True
+        )
+
         @callback(
             output=dict(
-                elements=Output(self.ID_GRAPH, 'elements'),
+                delta=Output(self.ID_DELTA, 'data'),
+                elements=Output(NetworkElementsStore.ID, 'data'),
                 layout=Output(self.ID_GRAPH, "layout"),
                 edge_count=Output(ID_NETWORK_VIZ_EDGE_COUNT, 'children'),
                 node_count=Output(ID_NETWORK_VIZ_NODE_COUNT, 'children'),
@@ -56,23 +74,28 @@ class NetworkVizGraph(dcc.Loading):
                 state_params=State(NetworkFormStore.ID, "data"),
                 state_meta=State(MetadataFileStore.ID, "data"),
                 prev_stylesheet=State(self.ID_GRAPH, 'stylesheet'),
-                network_interaction_state=State(NetworkInteractionStore.ID, 'data')
+                network_interaction_state=State(NetworkInteractionStore.ID, 'data'),
+                state_elements=State(NetworkElementsStore.ID, 'data')
             ),
         )
         def draw_graph(ts_graph, ts_param, state_graph, state_params, state_meta, prev_stylesheet,
-                       network_interaction_state):
+                       network_interaction_state, state_elements):
             # Output debugging information
             log_debug(f'{self.ID_GRAPH} - Drawing graph.')
             if ts_graph is None or state_graph is None:
                 log_debug(f'{self.ID_GRAPH} - No data to draw graph.')
                 raise PreventUpdate
 
+            # The graph is drawn by the WebGL component instead
+            params = NetworkFormStoreModel(**state_params)
+            if params.renderer is not NetworkRenderer.CYTOSCAPE:
+                raise PreventUpdate
+
             # Load the data
             graph = DistanceMatrixGraphStoreModel(**state_graph)
-            graph_read = graph.read()
-            params = NetworkFormStoreModel(**state_params)
+            edge_table = graph.read()
             meta = MetadataFileStoreModel(**state_meta)
-            interact = NetworkInteractionStoreModel(**network_interaction_state)
+            interact = NetworkInteractionStoreModel.load(network_interaction_state)
 
             out_graph = graph.filter_to_cytoscape(params)
 
@@ -85,14 +108,14 @@ class NetworkVizGraph(dcc.Loading):
                 cur_node_data = cur_node['data']
                 cur_node_id = cur_node_data['id']
 
-                cur_node_data['size'] = node_sizes.get(cur_node_id, 20)
+                cur_node_data['size'] = node_sizes.get(cur_node_id, cur_node_data.get('size', 20))
                 cur_node_data['color'] = node_colors.get(cur_node_id, '#848484')
 
             # Calculate how many nodes are visible
             n_nodes_vis = len(out_graph['nodes'])
-            n_nodes_tot = len(graph_read.nodes)
+            n_nodes_tot = edge_table.n_nodes
             n_edges_vis = len(out_graph['edges'])
-            n_edges_tot = len(graph_read.edges)
+            n_edges_tot = edge_table.n_edges
 
             # Toggle the filtering warning based on the graph counts
             if n_nodes_tot != n_nodes_vis or n_edges_tot != n_edges_vis:
@@ -121,7 +144,7 @@ class NetworkVizGraph(dcc.Loading):
                 if show_edge_width:
                     stylesheet.enable_edge_weights_thick()
                     normed_weights = normalize_edge_weights(
-                        params.edge_weights.file_id, list(graph_read.edges.items())
+                        params.edge_weights.file_id, edge_table, out_graph['edges']
                     )
                 else:
                     stylesheet.disable_edge_weights_thick()
@@ -134,20 +157,56 @@ class NetworkVizGraph(dcc.Loading):
                         cur_edge_data['label'] = cur_edge_data.get(params.edge_weights.file_id, 'N/A')
 
                     if show_edge_width:
-                        cur_source = cur_edge_data['source']
-                        cur_target = cur_edge_data['target']
-                        cur_key = sorted([f'{cur_source}-{cur_target}', f'{cur_target}-{cur_source}'])[0]
-                        cur_edge_data['width'] = normed_weights[cur_key]
+                        cur_edge_data['width'] = normed_weights[cur_edge_data['id']]
 
             # Otherwise, hide the annotations
             else:
                 stylesheet.disable_edge_weights_text()
                 stylesheet.disable_edge_weights_thick()
 
+            # Server-side layouts are sent as preset positions, which are specific to the topology
+            elements = out_graph['nodes'] + out_graph['edges']
+            layout_name = params.layout.name.replace('_', '-')
+            if params.layout.is_server_side():
+                layout_key = graph.get_layout_cache_key(params)
+            else:
+                layout_key = layout_name
+
+            def render(rendered: NetworkElementsStoreModel):
+                """
+                Compare the elements to those previously rendered, all elements are
+                sent if this is the first render, or most elements have changed.
+                """
+                delta = rendered.get_delta(elements)
+                n_changes = len(delta['remove']) + len(delta['add']) + len(delta['update'])
+                is_full_render = not rendered.elements or n_changes > len(elements) // 2
+                if is_full_render:
+                    delta = dict(elements=elements)
+                log_debug(f'{self.ID_GRAPH} - Sending {len(elements) if is_full_render else n_changes:,} '
+                          f'changes for {len(elements):,} elements.')
+
+                # The layout is only re-run if it has changed, or nodes were added
+                # (otherwise they would have no position)
+                nodes_added = any('source' not in x['data'] for x in delta.get('add', list()))
+                if not is_full_render and not nodes_added and rendered.layout == layout_key:
+                    layout = no_update
+                elif params.layout.is_server_side():
+                    layout = {'name': 'preset', 'positions': graph.get_node_positions(params), 'fit': True,
+                              'animate': True}
+                else:
+                    layout = {'name': layout_name, 'animate': True}
+                rendered.set_elements(elements, layout_key)
+                out.update(delta=delta, layout=layout)
+
+            # The rendered elements are updated (using the latest, should another render occur)
+            out = dict()
+            state_elements = NetworkElementsStoreModel.update(state_elements, render)
+
             # Return the graph
             return dict(
-                elements=dict(out_graph),
-                layout={'name': params.layout.name.replace('_', '-'), 'animate': True},
+                delta=out['delta'],
+                elements=state_elements,
+                layout=out['layout'],
                 edge_count=f'Edges: {n_edges_vis:,} / {n_edges_tot:,}',
                 node_count=f'Nodes: {n_nodes_vis:,} / {n_nodes_tot:,}',
                 filtering={'visibility': filtering},
@@ -159,7 +218,7 @@ class NetworkVizGraph(dcc.Loading):
                 network_interaction=Output(NetworkInteractionStore.ID, 'data', allow_duplicate=True)
             ),
             inputs=dict(
-                graph=Input(self.ID_GRAPH, "elements"),
+                graph=Input(NetworkElementsStore.ID, "data"),
                 state=State(NetworkInteractionStore.ID, 'data')
             ),
             prevent_initial_call=True
@@ -169,24 +228,16 @@ class NetworkVizGraph(dcc.Loading):
             Update the network interaction data based on node selection, or
             what is currently visible.
             """
-            if not graph:
-                raise PreventUpdate
-
-            # For some reason the graph can either be a dict or list
-            if isinstance(graph, dict):
-                nodes_visible = {x['data']['id'] for x in graph['nodes']}
-            elif isinstance(graph, list):
-                nodes_visible = {x['data']['id'] for x in graph}
-            else:
+            rendered = NetworkElementsStoreModel.load(graph)
+            if not rendered.elements:
                 raise PreventUpdate
+            nodes_visible = set(rendered.get_node_ids())
 
             # Store this in the network interaction store
-            network_interaction_store = NetworkInteractionStoreModel(**state)
-            network_interaction_store.set_visible_nodes(nodes_visible)
-
-            # Export the updated stylesheet with highlighting
             return dict(
-                network_interaction=network_interaction_store.model_dump(mode='json')
+                network_interaction=NetworkInteractionStoreModel.update(
+                    state, lambda x: x.set_visible_nodes(nodes_visible)
+                )
             )
 
         @callback(
@@ -195,7 +246,7 @@ class NetworkVizGraph(dcc.Loading):
             ),
             inputs=dict(
                 node_input=Input(self.ID_GRAPH, "tapNode"),
-                graph=State(self.ID_GRAPH, "elements"),
+                graph=State(NetworkElementsStore.ID, "data"),
                 state=State(NetworkInteractionStore.ID, 'data')
             ),
             prevent_initial_call=True
@@ -205,32 +256,49 @@ class NetworkVizGraph(dcc.Loading):
             Update the network interaction data based on node selection, or
             what is currently visible.
             """
-            if not graph:
-                raise PreventUpdate
-
-            # For some reason the graph can either be a dict or list
-            if isinstance(graph, dict):
-                nodes_visible = {x['data']['id'] for x in graph['nodes']}
-            elif isinstance(graph, list):
-                nodes_visible = {x['data']['id'] for x in graph}
-            else:
+            rendered = NetworkElementsStoreModel.load(graph)
+            if not rendered.elements:
                 raise PreventUpdate
+            nodes_visible = set(rendered.get_node_ids())
 
-            # Store this in the network interaction store
-            network_interaction_store = NetworkInteractionStoreModel(**state)
-            network_interaction_store.set_visible_nodes(nodes_visible)
+            def update_interaction(network_interaction_store: NetworkInteractionStoreModel):
+                # Store this in the network interaction store
+                network_interaction_store.set_visible_nodes(nodes_visible)
 
-            # Update on node selection
-            if node_input is not None:
-                # Obtain the node id that was selected
-                node_id = node_input['data']['id']
+                # Update on node selection (groups are expanded instead)
+                if node_input is not None and 'n_nodes' not in node_input['data']:
+                    # Obtain the node id that was selected
+                    node_id = node_input['data']['id']
 
-                # Record this interaction
-                network_interaction_store.toggle_node(node_id)
+                    # Record this interaction
+                    network_interaction_store.toggle_node(node_id)
 
             # Export the updated stylesheet with highlighting
             return dict(
-                network_interaction=network_interaction_store.model_dump(mode='json')
+                network_interaction=NetworkInteractionStoreModel.update(state, update_interaction)
+            )
+
+        @callback(
+            output=dict(
+                params=Output(NetworkFormStore.ID, 'data', allow_duplicate=True)
+            ),
+            inputs=dict(
+                node_input=Input(self.ID_GRAPH, "tapNode"),
+                state_params=State(NetworkFormStore.ID, 'data')
+            ),
+            prevent_initial_call=True
+        )
+        def expand_group_on_node_select(node_input, state_params):
+            """
+            For large graphs, expand the group of nodes that was selected (or
+            collapse it, if the node shown for an expanded group was selected).
+            """
+            if node_input is None or 'n_nodes' not in node_input['data']:
+                raise PreventUpdate
+            params = NetworkFormStoreModel(**state_params)
+            params.toggle_group(node_input['data']['id'], node_input['data']['n_nodes'])
+            return dict(
+                params=params.model_dump(mode='json')
             )
 
         @callback(
@@ -241,7 +309,7 @@ class NetworkVizGraph(dcc.Loading):
                 network_interaction_ts=Input(NetworkInteractionStore.ID, "modified_timestamp"),
                 prev_stylesheet=State(self.ID_GRAPH, 'stylesheet'),
                 network_interaction_state=State(NetworkInteractionStore.ID, 'data'),
-                graph=State(self.ID_GRAPH, 'elements')
+                graph=State(NetworkElementsStore.ID, 'data')
             ),
             prevent_initial_call=True
         )
@@ -255,20 +323,12 @@ class NetworkVizGraph(dcc.Loading):
                 if prev_stylesheet else NetworkVizStyleSheet()
 
             # Load the selected nodes from the store
-            network_interaction_store = NetworkInteractionStoreModel(**network_interaction_state)
+            network_interaction_store = NetworkInteractionStoreModel.load(network_interaction_state)
 
             # Reflect the state of the interaction in the stylesheet
-            # For some reason the graph can either be a dict or list
-            if isinstance(graph, dict):
-                graph_edges = graph.get('edges', list())
-            elif isinstance(graph, list):
-                graph_edges = [x for x in graph if 'source' in x.get('data', dict())]
-            else:
-                raise PreventUpdate
-
             stylesheet.update_from_iteraction_store(
                 network_interaction_store,
-                graph_edges
+                NetworkElementsStoreModel.load(graph).get_edges()
             )
 
             # Export the updated stylesheet with highlighting
@@ -340,13 +400,14 @@ def get_colours_for_nodes(param: Optional[NetworkParamNodeColor], meta: Metadata
     return out
 
 
-def normalize_edge_weights(file_id, edges):
-    data = dict()
-    for (source, target), d_values in edges:
-        key = sorted([f'{source}-{target}', f'{target}-{source}'])[0]
-        value = d_values.get(file_id, 0)
-        data[key] = value
-    min_val = min(data.values())
-    max_val = max(data.values())
+def normalize_edge_weights(file_id: str, edge_table: EdgeTable, edges: List[dict]):
+    """
+    Normalize the weights of the edges relative to all edges in the graph.
+    """
+    min_val, max_val = edge_table.get_min_max(file_id, fill_value=0)
     range_val = max_val - min_val
-    return {k: (v - min_val) / range_val for k, v in data.items()}
+    out = dict()
+    for edge in edges:
+        value = edge['data'].get(file_id, 0)
+        out[edge['data']['id']] = (value - min_val) / range_val
+    return out
@@ -0,0 +1,269 @@
+from typing import Dict, List, Tuple
+
+import networkx as nx
+import plotly.graph_objects as go
+from dash import Output, Input, callback, State, dcc, Patch
+from dash.exceptions import PreventUpdate
+
+from indizio.components.network.network_graph import NetworkVizGraph, get_sizes_for_nodes, get_colours_for_nodes
+from indizio.config import ID_NETWORK_VIZ_EDGE_COUNT, ID_NETWORK_VIZ_NODE_COUNT, ID_NETWORK_VIZ_FILTERING_APPLIED
+from indizio.models.network.parameters import NetworkRenderer, NetworkFormLayoutOption
+from indizio.store.metadata_file import MetadataFileStore, MetadataFileStoreModel
+from indizio.store.network.graph import DistanceMatrixGraphStore, DistanceMatrixGraphStoreModel
+from indizio.store.network.interaction import NetworkInteractionStoreModel, NetworkInteractionStore
+from indizio.store.network.parameters import NetworkFormStore, NetworkFormStoreModel
+from indizio.util.log import log_debug
+
+
+class NetworkVizWebGl(dcc.Loading):
+    """
+    The WebGL network graph component, this is used for graphs that are too
+    large to be drawn with cytoscape. The node positions are computed on the
+    server (using the force-directed layout unless a server layout is selected).
+    """
+    ID = 'network-viz-webgl'
+    ID_GRAPH = f'{ID}-graph'
+    ID_LOADING = f'{ID}-loading'
+
+    # The index of each trace in the figure
+    TRACE_EDGES = 0
+    TRACE_NODES = 1
+    TRACE_SELECTED_EDGES = 2
+    TRACE_SELECTED_NODES = 3
+
+    def __init__(self):
+        super().__init__(
+            id=self.ID_LOADING,
+            parent_style={'display': 'none'},
+            children=[
+                dcc.Graph(
+                    id=self.ID_GRAPH,
+                    style={'width': '100%', 'height': 'calc(100vh - 210px)'},
+                    config={'scrollZoom': True, 'displaylogo': False},
+                )
+            ],
+        )
+
+        @callback(
+            output=dict(
+                webgl=Output(self.ID_LOADING, 'parent_style'),
+                cytoscape=Output(NetworkVizGraph.ID_LOADING, 'parent_style'),
+            ),
+            inputs=dict(
+                ts_param=Input(NetworkFormStore.ID, "modified_timestamp"),
+                state_params=State(NetworkFormStore.ID, "data"),
+            ),
+        )
+        def toggle_renderer(ts_param, state_params):
+            if ts_param is None or state_params is None:
+                raise PreventUpdate
+            params = NetworkFormStoreModel(**state_params)
+            is_webgl = params.renderer is NetworkRenderer.WEBGL
+            return dict(
+                webgl={} if is_webgl else {'display': 'none'},
+                cytoscape={'display': 'none'} if is_webgl else {},
+            )
+
+        @callback(
+            output=dict(
+                fig=Output(self.ID_GRAPH, 'figure'),
+                network_interaction=Output(NetworkInteractionStore.ID, 'data', allow_duplicate=True),
+                edge_count=Output(ID_NETWORK_VIZ_EDGE_COUNT, 'children', allow_duplicate=True),
+                node_count=Output(ID_NETWORK_VIZ_NODE_COUNT, 'children', allow_duplicate=True),
+                filtering=Output(ID_NETWORK_VIZ_FILTERING_APPLIED, 'style', allow_duplicate=True),
+            ),
+            inputs=dict(
+                ts_graph=Input(DistanceMatrixGraphStore.ID, "modified_timestamp"),
+                ts_param=Input(NetworkFormStore.ID, "modified_timestamp"),
+                state_graph=State(DistanceMatrixGraphStore.ID, "data"),
+                state_params=State(NetworkFormStore.ID, "data"),
+                state_meta=State(MetadataFileStore.ID, "data"),
+                network_interaction_state=State(NetworkInteractionStore.ID, 'data'),
+            ),
+            prevent_initial_call='initial_duplicate'
+        )
+        def draw_graph(ts_graph, ts_param, state_graph, state_params, state_meta, network_interaction_state):
+            if ts_graph is None or not state_graph or state_params is None:
+                raise PreventUpdate
+            params = NetworkFormStoreModel(**state_params)
+            if params.renderer is not NetworkRenderer.WEBGL:
+                raise PreventUpdate
+            log_debug(f'{self.ID_GRAPH} - Drawing graph.')
+
+            # Load the data
+            graph = DistanceMatrixGraphStoreModel(**state_graph)
+            edge_table = graph.read()
+            meta = MetadataFileStoreModel(**state_meta)
+            filtered_graph = graph.filter(params)
+            positions = get_webgl_positions(graph, params)
+
+            # Create the figure (the selected nodes are added when highlighted)
+            node_sizes = get_sizes_for_nodes(params.node_size, meta)
+            node_colors = get_colours_for_nodes(params.node_color, meta)
+            fig = create_webgl_figure(filtered_graph, positions, node_sizes, node_colors)
+            fig.update_layout(uirevision=f'{graph.hash}-{params.layout.name}')
+
+            # Record the nodes that are visible
+            nodes_visible = set(filtered_graph.nodes)
+            network_interaction_state = NetworkInteractionStoreModel.update(
+                network_interaction_state, lambda x: x.set_visible_nodes(nodes_visible)
+            )
+
+            # Toggle the filtering warning based on the graph counts
+            n_nodes_vis, n_edges_vis = filtered_graph.number_of_nodes(), filtered_graph.number_of_edges()
+            if edge_table.n_nodes != n_nodes_vis or edge_table.n_edges != n_edges_vis:
+                filtering = 'visible'
+            else:
+                filtering = 'hidden'
+
+            return dict(
+                fig=fig,
+                network_interaction=network_interaction_state,
+                edge_count=f'Edges: {n_edges_vis:,} / {edge_table.n_edges:,}',
+                node_count=f'Nodes: {n_nodes_vis:,} / {edge_table.n_nodes:,}',
+                filtering={'visibility': filtering},
+            )
+
+        @callback(
+            output=dict(
+                network_interaction=Output(NetworkInteractionStore.ID, 'data', allow_duplicate=True)
+            ),
+            inputs=dict(
+                click_data=Input(self.ID_GRAPH, 'clickData'),
+                state=State(NetworkInteractionStore.ID, 'data')
+            ),
+            prevent_initial_call=True
+        )
+        def update_interaction_on_node_select(click_data, state):
+            """
+            Toggle the selection of the node that was clicked.
+            """
+            points = [x for x in (click_data or dict()).get('points', list()) if 'customdata' in x]
+            if not points:
+                raise PreventUpdate
+            node_id = points[0]['customdata']
+            return dict(
+                network_interaction=NetworkInteractionStoreModel.update(state, lambda x: x.toggle_node(node_id))
+            )
+
+        @callback(
+            output=dict(
+                fig=Output(self.ID_GRAPH, 'figure', allow_duplicate=True),
+            ),
+            inputs=dict(
+                network_interaction_ts=Input(NetworkInteractionStore.ID, "modified_timestamp"),
+                network_interaction_state=State(NetworkInteractionStore.ID, 'data'),
+                state_graph=State(DistanceMatrixGraphStore.ID, "data"),
+                state_params=State(NetworkFormStore.ID, "data"),
+            ),
+            prevent_initial_call=True
+        )
+        def highlight_on_node_select(network_interaction_ts, network_interaction_state, state_graph, state_params):
+            """
+            Only the traces of the selected nodes and edges are updated.
+            """
+            if network_interaction_ts is None or not state_graph or state_params is None:
+                raise PreventUpdate
+            params = NetworkFormStoreModel(**state_params)
+            if params.renderer is not NetworkRenderer.WEBGL:
+                raise PreventUpdate
+
+            graph = DistanceMatrixGraphStoreModel(**state_graph)
+            filtered_graph = graph.filter(params)
+            positions = get_webgl_positions(graph, params)
+            interact = NetworkInteractionStoreModel.load(network_interaction_state)
+
+            nodes = [x for x in sorted(interact.nodes_selected) if x in positions]
+            edge_x, edge_y = get_edge_coordinates(filtered_graph.subgraph(nodes).edges, positions)
+
+            fig = Patch()
+            fig['data'][self.TRACE_SELECTED_EDGES]['x'] = edge_x
+            fig['data'][self.TRACE_SELECTED_EDGES]['y'] = edge_y
+            fig['data'][self.TRACE_SELECTED_NODES]['x'] = [positions[x]['x'] for x in nodes]
+            fig['data'][self.TRACE_SELECTED_NODES]['y'] = [positions[x]['y'] for x in nodes]
+            fig['data'][self.TRACE_SELECTED_NODES]['text'] = nodes
+            fig['data'][self.TRACE_SELECTED_NODES]['customdata'] = nodes
+            return dict(
+                fig=fig
+            )
+
+
+def get_webgl_positions(graph: DistanceMatrixGraphStoreModel, params: NetworkFormStoreModel) -> Dict[str, Dict[str, float]]:
+    """
+    Returns the position of each node in the filtered graph, the force-directed
+    layout is used if the selected layout is computed in the browser.
+    """
+    if not params.layout.is_server_side():
+        params = params.model_copy(update={'layout': NetworkFormLayoutOption.spring})
+    return graph.get_node_positions(params, level_of_detail=False)
+
+
+def get_edge_coordinates(edges, positions: Dict[str, Dict[str, float]]) -> Tuple[List, List]:
+    """
+    Returns the coordinates of each edge as a single line, separated by None.
+    """
+    edge_x, edge_y = list(), list()
+    for node_a, node_b in edges:
+        edge_x.extend((positions[node_a]['x'], positions[node_b]['x'], None))
+        edge_y.extend((positions[node_a]['y'], positions[node_b]['y'], None))
+    return edge_x, edge_y
+
+
+def create_webgl_figure(
+        graph: nx.Graph,
+        positions: Dict[str, Dict[str, float]],
+        node_sizes: Dict[str, float],
+        node_colors: Dict[str, str]
+) -> go.Figure:
+    """
+    Create a WebGL scatter plot of the graph, the y-axis is reversed to match cytoscape.
+    The node sizes are scaled from 0 to 100 (as in the cytoscape stylesheet).
+    """
+    nodes = list(graph.nodes)
+    edge_x, edge_y = get_edge_coordinates(graph.edges, positions)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=edge_x,
+        y=edge_y,
+        mode='lines',
+        line=dict(color='#848484', width=0.5),
+        opacity=0.4,
+        hoverinfo='skip',
+    ))
+    fig.add_trace(go.Scattergl(
+        x=[positions[x]['x'] for x in nodes],
+        y=[positions[x]['y'] for x in nodes],
+        mode='markers',
+        text=nodes,
+        customdata=nodes,
+        hovertemplate='%{text}<extra></extra>',
+        marker=dict(
+            size=[5 + node_sizes.get(x, 20) / 100 * 20 for x in nodes],
+            color=[node_colors.get(x, '#848484') for x in nodes],
+        ),
+    ))
+    fig.add_trace(go.Scattergl(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='#eb6864', width=1.5),
+        hoverinfo='skip',
+    ))
+    fig.add_trace(go.Scattergl(
+        x=[],
+        y=[],
+        mode='markers',
+        hovertemplate='%{text}<extra></extra>',
+        marker=dict(size=12, color='#eb6864', line=dict(color='#963835', width=2)),
+    ))
+    fig.update_layout(
+        showlegend=False,
+        dragmode='pan',
+        hovermode='closest',
+        plot_bgcolor='white',
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False, autorange='reversed', scaleanchor='x'),
+    )
+    return fig
@@ -8,6 +8,7 @@ from indizio.components.network.parameters.display_properties import NetworkPara
 from indizio.components.network.parameters.layout import NetworkFormLayout
 from indizio.components.network.parameters.node_metadata import NetworkFormNodeMetadata
 from indizio.components.network.parameters.node_of_interest import NetworkFormNodeOfInterest
+from indizio.components.network.parameters.renderer import NetworkFormRenderer
 from indizio.components.network.parameters.thresh_filter_container import NetworkThreshFilterContainer
 
 
@@ -40,6 +41,12 @@ class NetworkFormParameters(html.Div):
                     children=[
                         NetworkFormLayout(),
 
+                        html.Div(
+                            className='mt-3',
+                            children=[
+                                NetworkFormRenderer(),
+                            ]),
+
                         html.Div(
                             className='mt-3',
                             children=[
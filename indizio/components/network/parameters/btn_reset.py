@@ -47,9 +47,9 @@ class NetworkFormBtnReset(dbc.Button):
             dm_store = DistanceMatrixStoreModel(**state_dm)
             graph_store = DistanceMatrixGraphStoreModel(**state_graph)
 
-            graph = graph_store.read()
-            graph_nodes = frozenset(graph.nodes)
-            graph_max_degree = max(d for _, d in graph.degree)
+            edge_table = graph_store.read()
+            graph_nodes = frozenset(edge_table.get_node_labels())
+            graph_max_degree = int(edge_table.degree().max())
 
             # Reset it to the original state
             network_params = NetworkFormStoreModel()
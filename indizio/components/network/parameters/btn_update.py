@@ -6,6 +6,7 @@ from dash.exceptions import PreventUpdate
 
 from indizio.components.network.parameters.layout import NetworkFormLayout
 from indizio.components.network.parameters.node_of_interest import NetworkFormNodeOfInterest
+from indizio.components.network.parameters.renderer import NetworkFormRenderer
 from indizio.components.network.parameters.thresh_filter_item import NetworkThreshFilterItem
 from indizio.components.network.parameters.thresh_matching import NetworkThreshMatching
 from indizio.config import ID_NETWORK_FORM_DEGREE_LOWER_VALUE, ID_NETWORK_FORM_DEGREE_UPPER_VALUE, \
@@ -15,7 +16,7 @@ from indizio.config import ID_NETWORK_FORM_DEGREE_LOWER_VALUE, ID_NETWORK_FORM_D
 from indizio.models.common.boolean import BooleanAllAny, BooleanShowHide
 from indizio.models.common.bound import Bound
 from indizio.models.network.parameters import EdgeWeights, NetworkFormLayoutOption, NetworkParamNodeColor, \
-    NetworkParamNodeSize, NetworkParamDegree, NetworkParamThreshold, NetworkParamEdgeWeights
+    NetworkParamNodeSize, NetworkParamDegree, NetworkParamThreshold, NetworkParamEdgeWeights, NetworkRenderer
 from indizio.store.network.parameters import NetworkFormStore, NetworkFormStoreModel
 
 
@@ -43,6 +44,7 @@ class NetworkFormBtnUpdate(dbc.Button):
                 n_clicks=Input(self.ID, "n_clicks"),
 
                 layout=State(NetworkFormLayout.ID, "value"),
+                renderer=State(NetworkFormRenderer.ID, "value"),
 
                 node_of_interest=State(NetworkFormNodeOfInterest.ID, "value"),
 
@@ -71,6 +73,7 @@ class NetworkFormBtnUpdate(dbc.Button):
         def on_submit(
                 n_clicks,
                 layout,
+                renderer,
                 node_of_interest,
                 node_color_file,
                 node_color_column,
@@ -96,6 +99,7 @@ class NetworkFormBtnUpdate(dbc.Button):
             network_form_state = NetworkFormStoreModel()
 
             network_form_state.layout = NetworkFormLayoutOption(layout)
+            network_form_state.renderer = NetworkRenderer(renderer)
 
             network_form_state.node_of_interest = node_of_interest or list()
 
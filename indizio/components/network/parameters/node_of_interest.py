@@ -60,9 +60,9 @@ class NetworkFormNodeOfInterest(dbc.Card):
                 )
 
             # De-serialize the graph and return the nodes
-            graph = DistanceMatrixGraphStoreModel(**state_graph).read()
+            edge_table = DistanceMatrixGraphStoreModel(**state_graph).read()
 
             return dict(
-                options=sorted(graph.nodes),
+                options=edge_table.get_node_labels(),
                 value=value
             )
@@ -0,0 +1,47 @@
+import dash_bootstrap_components as dbc
+from dash import Output, Input, callback, State
+from dash import html
+from dash.exceptions import PreventUpdate
+
+from indizio.models.network.parameters import NetworkRenderer
+from indizio.store.network.parameters import NetworkFormStore, NetworkFormStoreModel
+
+
+class NetworkFormRenderer(html.Div):
+    """
+    This component is the drop-down menu selector for the component that draws the network.
+    """
+
+    ID = "network-form-renderer"
+
+    def __init__(self):
+        super().__init__(
+            [
+                dbc.InputGroup(
+                    children=[
+                        dbc.InputGroupText(html.B("Renderer")),
+                        dbc.Select(
+                            id=self.ID,
+                            options=NetworkRenderer.to_options(),
+                            value=NetworkFormStoreModel().renderer.value,
+                        )
+                    ])
+            ]
+        )
+
+        @callback(
+            output=dict(
+                value=Output(self.ID, "value"),
+            ),
+            inputs=dict(
+                ts=Input(NetworkFormStore.ID, "modified_timestamp"),
+                state=State(NetworkFormStore.ID, "data"),
+            )
+        )
+        def reflect_store_parameters(ts, state):
+            if ts is None or state is None:
+                raise PreventUpdate
+            params = NetworkFormStoreModel(**state)
+            return dict(
+                value=params.renderer.value
+            )
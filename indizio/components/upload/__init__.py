@@ -1,12 +1,15 @@
 import dash_bootstrap_components as dbc
 from dash import html
 
+from indizio.components.upload.association_metric import UploadFormAssociationMetric
 from indizio.components.upload.btn_clear import UploadFormBtnClear
 from indizio.components.upload.btn_example import UploadFormBtnExample
 from indizio.components.upload.btn_upload import UploadFormBtnUpload
+from indizio.components.upload.edge_extraction import UploadFormEdgeExtraction
 from indizio.components.upload.pending.file_selector_container import UploadFormFileSelectorContainer
 from indizio.components.upload.pending.file_upload_form import UploadFormFileUploadForm
 from indizio.components.upload.processed import UploadedFileContainer
+from indizio.components.upload.progress import UploadFormProgress
 
 
 class UploadFormContainer(html.Div):
@@ -25,6 +28,18 @@ class UploadFormContainer(html.Div):
                         UploadFormFileUploadForm()
                     ]
                 ),
+                dbc.Row(
+                    className='justify-content-center align-items-center',
+                    children=[
+                        UploadFormAssociationMetric()
+                    ]
+                ),
+                dbc.Row(
+                    className='justify-content-center align-items-center mt-3',
+                    children=[
+                        UploadFormEdgeExtraction()
+                    ]
+                ),
                 dbc.Row(
                     className='justify-content-center align-items-center mt-3',
                     children=[
@@ -33,6 +48,12 @@ class UploadFormContainer(html.Div):
                         UploadFormBtnExample()
                     ]
                 ),
+                dbc.Row(
+                    className='justify-content-center align-items-center',
+                    children=[
+                        UploadFormProgress()
+                    ]
+                ),
                 dbc.Row(
                     className='justify-content-center align-items-top mt-5',
                     children=[
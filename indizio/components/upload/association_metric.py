@@ -0,0 +1,27 @@
+import dash_bootstrap_components as dbc
+from dash import html
+
+from indizio.models.presence_absence.association import AssociationMetric
+
+
+class UploadFormAssociationMetric(html.Div):
+    """
+    This component selects the metrics used to create a matrix from each
+    presence/absence file (only used if no matrices are provided).
+    """
+
+    ID = "upload-form-association-metric"
+
+    def __init__(self):
+        super().__init__(
+            className='d-flex justify-content-center align-items-center',
+            children=[
+                html.B("Presence/Absence Metrics", className='me-3'),
+                dbc.Checklist(
+                    id=self.ID,
+                    options=AssociationMetric.to_options(),
+                    value=[AssociationMetric.PEARSON.value],
+                    inline=True,
+                )
+            ]
+        )
@@ -162,7 +162,7 @@ class UploadFormBtnExample(dbc.Button):
             network_store = NetworkFormStoreModel(
                 thresholds=network_store_thresholds,
                 degree=NetworkParamDegree(
-                    max_value=max(x[1] for x in graph_store.read().degree),
+                    max_value=int(graph_store.read().degree().max()),
                 ),
                 node_color=NetworkParamNodeColor(
                     file_id=meta_file_graph.file_id,
@@ -202,7 +202,7 @@ class UploadFormBtnExample(dbc.Button):
                 dm_graph_store=graph_store.model_dump(mode='json'),
                 clustergram_params=clustergram_params.model_dump(mode='json'),
                 matrix_param_store=matrix_params.model_dump(mode='json'),
-                network_interaction=NetworkInteractionStoreModel().model_dump(mode='json'),
+                network_interaction=NetworkInteractionStoreModel().save(None),
                 reload="/",
                 clustergram_legend=clustergram_legend.model_dump(mode='json'),
             )
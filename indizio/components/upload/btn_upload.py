@@ -1,16 +1,20 @@
 import dash_bootstrap_components as dbc
-from dash import Output, Input, callback, State, ALL, ctx
+from dash import Output, Input, callback, State, ALL, ctx, clientside_callback, ClientsideFunction
 from dash.exceptions import PreventUpdate
 
 from indizio.components.layout.message import LayoutMessage
 from indizio.components.layout.reload import LayoutReload
+from indizio.components.upload.association_metric import UploadFormAssociationMetric
+from indizio.components.upload.edge_extraction import UploadFormEdgeExtraction
 from indizio.components.upload.pending.file_selector import UploadFormFileSelector
+from indizio.components.upload.progress import UploadFormProgress
 
 
 from indizio.models.common.file_type import UserFileType
 from indizio.models.distance_matrix.dm_file import DistanceMatrixFile
 from indizio.models.metadata.metadata_file import MetadataFile
 from indizio.models.network.parameters import NetworkParamThreshold
+from indizio.models.presence_absence.association import AssociationMetric
 from indizio.models.presence_absence.pa_file import PresenceAbsenceFile
 from indizio.models.tree.tree_file import TreeFile
 from indizio.store.clustergram.parameters import ClustergramParametersStore, ClustergramParametersStoreModel
@@ -24,6 +28,7 @@ from indizio.store.tree_file import  TreeFileStore, TreeFileStoreModel
 from indizio.store.upload_form_store import UploadFormStore, UploadFormData
 from indizio.util.callbacks import notify_user
 from indizio.util.log import log_debug, log_info, log_warn
+from indizio.util.progress import PROGRESS
 
 
 class UploadFormBtnUpload(dbc.Button):
@@ -47,6 +52,14 @@ class UploadFormBtnUpload(dbc.Button):
             className='me-2'
         )
 
+        # A new progress token is created in the browser each time the button is clicked
+        clientside_callback(
+            ClientsideFunction(namespace='upload', function_name='new_progress_token'),
+            Output(UploadFormProgress.ID_TOKEN, 'data'),
+            Input(self.ID, 'n_clicks'),
+            prevent_initial_call=True
+        )
+
         @callback(
             output=dict(
                 pa=Output(PresenceAbsenceStore.ID, 'data'),
@@ -64,7 +77,7 @@ class UploadFormBtnUpload(dbc.Button):
                 cg_params=Output(ClustergramParametersStore.ID, 'data', allow_duplicate=True),
             ),
             inputs=dict(
-                n_clicks=Input(self.ID, 'n_clicks'),
+                token=Input(UploadFormProgress.ID_TOKEN, 'data'),
                 values=State({'type': UploadFormFileSelector.ID_TYPE, 'hash': ALL}, 'value'),
                 names=State({'type': UploadFormFileSelector.ID_NAME, 'hash': ALL}, 'value'),
                 state_upload=State(UploadFormStore.ID, 'data'),
@@ -72,27 +85,35 @@ class UploadFormBtnUpload(dbc.Button):
                 state_dm=State(DistanceMatrixStore.ID, 'data'),
                 state_meta=State(MetadataFileStore.ID, 'data'),
                 state_tree=State(TreeFileStore.ID, 'data'),
-                state_network_params=State(NetworkFormStore.ID, 'data')
+                state_network_params=State(NetworkFormStore.ID, 'data'),
+                metrics=State(UploadFormAssociationMetric.ID, 'value'),
+                edge_min_value=State(UploadFormEdgeExtraction.ID_MIN_VALUE, 'value'),
+                edge_top_k=State(UploadFormEdgeExtraction.ID_TOP_K, 'value'),
             ),
             running=[
                 (Output(self.ID, "disabled"), True, False),
+                (Output(UploadFormProgress.ID_INTERVAL, "disabled"), False, True),
+                (Output(UploadFormProgress.ID, "style"), UploadFormProgress.STYLE_VISIBLE,
+                 UploadFormProgress.STYLE_HIDDEN),
             ],
             prevent_initial_call=True,
         )
-        def upload_content(n_clicks, values, names, state_upload, state_pa, state_dm,
-                           state_meta, state_tree, state_network_params):
+        def upload_content(token, values, names, state_upload, state_pa, state_dm,
+                           state_meta, state_tree, state_network_params, metrics, edge_min_value, edge_top_k):
             """
             Processess each of the uploaded files as per their file type.
 
             Afterwards, the store that holds this information is cleared to save
-            browser memory.
+            browser memory. The progress is recorded against the token created
+            when the button was clicked.
             """
 
-            # Ensure that this was triggered by a user clicking the button
-            if n_clicks is None:
+            # Ensure that this was triggered by a user clicking the button (i.e. a token was created)
+            if token is None:
                 log_debug(f'{self.ID} - Nothing to do, updated prevented.')
                 raise PreventUpdate
             log_debug(f'{self.ID} - Processing files: {values}')
+            PROGRESS.update(token, 0, 'Reading files')
 
             # Load the existing state of the stores (if present)
             try:
@@ -132,7 +153,9 @@ class UploadFormBtnUpload(dbc.Button):
                 return notify_user('No files were provided, ensure each file has a type.')
 
             # Classify the files into their respective types
-            for file_obj in upload_store.data.values():
+            for file_idx, file_obj in enumerate(upload_store.data.values()):
+                PROGRESS.update(token, 0.2 * file_idx / len(upload_store.data),
+                                f'Reading {file_obj.file_name}')
                 file_type = d_file_types.get(file_obj.hash)
                 file_obj.name = d_file_names.get(file_obj.hash, file_obj.name)
                 if file_type is UserFileType.PA:
@@ -160,16 +183,25 @@ class UploadFormBtnUpload(dbc.Button):
                     continue
 
             # If no distance matrices were provided, then create and calculate
-            # one from the presence/absence file.
+            # one from the presence/absence file for each selected metric.
             if len(dm_store.data) == 0:
                 log_info(f'{self.ID} - No distance matrices provided, creating one from presence/absence file.')
                 if len(pa_store.data) == 0:
                     return notify_user('A Presence/Absence matrix must be provided.')
+                elif not metrics:
+                    return notify_user('At least one Presence/Absence metric must be selected.')
                 # Otherwise, compute one from each presence absence file
                 else:
-                    for pa_file in pa_store.data.values():
+                    jobs = [(x, AssociationMetric(y)) for x in pa_store.data.values() for y in metrics]
+                    for job_idx, (pa_file, metric) in enumerate(jobs):
+                        progress = PROGRESS.get_progress_fn(
+                            token,
+                            f'Computing the {metric.value} for {pa_file.file_name}',
+                            start=0.2 + 0.6 * job_idx / len(jobs),
+                            end=0.2 + 0.6 * (job_idx + 1) / len(jobs),
+                        )
                         try:
-                            dm_store.add_item(pa_file.as_distance_matrix())
+                            dm_store.add_item(pa_file.as_distance_matrix(metric, progress))
                         except Exception as e:
                             return notify_user(f'Unable to convert {pa_file.file_name} to a Matrix.', e)
 
@@ -181,18 +213,23 @@ class UploadFormBtnUpload(dbc.Button):
             )
 
             # Create the graph
+            PROGRESS.update(token, 0.8, 'Creating the graph')
             try:
-                graph = DistanceMatrixGraphStoreModel.from_distance_matricies(dm_store.get_files())
+                graph = DistanceMatrixGraphStoreModel.from_distance_matricies(
+                    dm_store.get_files(),
+                    min_value=float(edge_min_value) if edge_min_value is not None else None,
+                    top_k=int(edge_top_k) if edge_top_k is not None else None
+                )
             except Exception as e:
                 return notify_user('Unable to create Graph from Distance Matricies.', e)
 
             # Load the graph
             try:
-                graph_nx = graph.read()
-                graph_nodes = frozenset(graph_nx.nodes)
-                graph_max_degree = max(d for _, d in graph_nx.degree)
+                edge_table = graph.read()
+                graph_nodes = frozenset(edge_table.get_node_labels())
+                graph_max_degree = int(edge_table.degree().max())
             except Exception as e:
-                return notify_user('Unable to read NetworkX Graph.', e)
+                return notify_user('Unable to read the Graph.', e)
 
             # Create the network parameters
             try:
@@ -223,6 +260,7 @@ class UploadFormBtnUpload(dbc.Button):
             # Now that we've calculated everything, we need to serialize the content
             # into JSON so that it can be stored in the browser
             log_debug(f'{self.ID} - Finished processing files, returning data to stores.')
+            PROGRESS.update(token, 1, 'Done')
             return dict(
                 pa=pa_store.model_dump(mode='json'),
                 dm=dm_store.model_dump(mode='json'),
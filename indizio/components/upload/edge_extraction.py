@@ -0,0 +1,45 @@
+import dash_bootstrap_components as dbc
+from dash import html
+
+
+class UploadFormEdgeExtraction(html.Div):
+    """
+    This component sets the optional limits on the edges that are extracted from
+    each matrix to create the graph (all edges are extracted if empty).
+    """
+
+    ID = "upload-form-edge-extraction"
+    ID_MIN_VALUE = f'{ID}-min-value'
+    ID_TOP_K = f'{ID}-top-k'
+
+    def __init__(self):
+        super().__init__(
+            className='d-flex justify-content-center align-items-center',
+            children=[
+                dbc.InputGroup(
+                    style={'width': '300px'},
+                    className='me-2',
+                    children=[
+                        dbc.InputGroupText(html.B("Minimum edge value")),
+                        dbc.Input(
+                            id=self.ID_MIN_VALUE,
+                            type='number',
+                            placeholder='All',
+                        ),
+                    ]
+                ),
+                dbc.InputGroup(
+                    style={'width': '300px'},
+                    children=[
+                        dbc.InputGroupText(html.B("Edges per node")),
+                        dbc.Input(
+                            id=self.ID_TOP_K,
+                            type='number',
+                            min=1,
+                            step=1,
+                            placeholder='All',
+                        ),
+                    ]
+                ),
+            ]
+        )
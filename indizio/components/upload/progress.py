@@ -0,0 +1,73 @@
+import dash_bootstrap_components as dbc
+from dash import Output, Input, State, html, callback, dcc
+from dash.exceptions import PreventUpdate
+
+from indizio.util.progress import PROGRESS
+
+
+class UploadFormProgress(html.Div):
+    """
+    This component displays the progress of the files being processed.
+    It is only visible (and polled) while the upload button callback is running,
+    the progress is read for the token of the current upload.
+    """
+
+    ID = "upload-form-progress"
+    ID_BAR = f'{ID}-bar'
+    ID_MESSAGE = f'{ID}-message'
+    ID_INTERVAL = f'{ID}-interval'
+    ID_TOKEN = f'{ID}-token'
+    INTERVAL_MS = 500
+
+    STYLE_VISIBLE = {'width': '500px'}
+    STYLE_HIDDEN = {'display': 'none'}
+
+    def __init__(self):
+        super().__init__(
+            id=self.ID,
+            style=self.STYLE_HIDDEN,
+            className='mt-3',
+            children=[
+                dbc.Progress(
+                    id=self.ID_BAR,
+                    value=0,
+                    striped=True,
+                    animated=True,
+                ),
+                html.Small(
+                    id=self.ID_MESSAGE,
+                    className='text-muted',
+                ),
+                dcc.Interval(
+                    id=self.ID_INTERVAL,
+                    interval=self.INTERVAL_MS,
+                    disabled=True,
+                ),
+                dcc.Store(id=self.ID_TOKEN, storage_type='memory'),
+            ]
+        )
+
+        @callback(
+            output=dict(
+                value=Output(self.ID_BAR, 'value'),
+                label=Output(self.ID_BAR, 'label'),
+                message=Output(self.ID_MESSAGE, 'children'),
+            ),
+            inputs=dict(
+                n_intervals=Input(self.ID_INTERVAL, 'n_intervals'),
+                token=State(self.ID_TOKEN, 'data'),
+            ),
+            prevent_initial_call=True,
+        )
+        def update_progress(n_intervals, token):
+            """
+            Read the current progress of the upload from the server.
+            """
+            if token is None:
+                raise PreventUpdate
+            value, message = PROGRESS.get(token)
+            return dict(
+                value=round(value * 100),
+                label=f'{value:.0%}',
+                message=message,
+            )
@@ -14,6 +14,37 @@ PERSISTENCE_TYPE = 'session'
 TMP_DIR = Path(tempfile.gettempdir()) / 'indizio'
 TMP_DIR.mkdir(parents=True, exist_ok=True)
 
+# The maximum size (bytes) of deserialized files that are kept in memory.
+MODEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Results computed from uploaded files are cached here (persisting between sessions).
+DISK_CACHE_DIR = TMP_DIR / 'diskcache'
+
+# The maximum size (bytes) of the disk cache, and of all files in the temporary directory.
+DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+TMP_DIR_MAX_BYTES = 20 * 1024 * 1024 * 1024
+
+# Filtered network graphs are cached here, the least recently used are evicted.
+GRAPH_CACHE_DIR = TMP_DIR / 'graph-cache'
+GRAPH_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# The results of callbacks (e.g. figures) are memoized in memory up to this size (bytes),
+# optionally, they can be shared between worker processes using this directory.
+CALLBACK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+CALLBACK_CACHE_DIR = TMP_DIR / 'callback-cache'
+
+# The data of stores that are kept on the server (the browser only stores a reference).
+SESSION_STORE_DIR = TMP_DIR / 'session-store'
+SESSION_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Filtered graphs with more nodes than this are displayed with communities collapsed,
+# only the edges between communities with the most underlying edges are shown.
+NETWORK_LOD_MAX_NODES = 2000
+NETWORK_LOD_MAX_EDGES = 10000
+
+# The optimal leaf ordering of the clustergram is approximated if more than this many leaves are clustered.
+CLUSTERGRAM_OPTIMAL_LEAF_ORDER_MAX_LEAVES = 1000
+
 # Identifiers for some components where a circular import would otherwise be created.
 ID_MATRIX_PARAMS_METRIC = 'matrix-params-metric'
 ID_CLUSTERGRAM_PARAMS_METRIC = 'clustergram-params-metric'
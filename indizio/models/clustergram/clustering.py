@@ -0,0 +1,153 @@
+from enum import Enum
+from typing import List, Tuple
+
+import numpy as np
+import scipy.cluster.hierarchy as sch
+from pydantic import BaseModel
+from scipy.spatial.distance import pdist, cdist
+
+from indizio.util.cache import cache_by
+
+# The spacing between leaves of the dendrogram (in axis units), as in scipy.
+LEAF_SPACING = 10
+
+# The style of the dendrogram traces.
+DENDROGRAM_COLOR = 'rgb(0,116,217)'
+DENDROGRAM_LINE_WIDTH = 2.0
+
+
+class ClusterAxis(Enum):
+    """
+    The axis of the matrix that is clustered.
+    """
+    ROWS = 'row'
+    COLUMNS = 'col'
+
+
+class LeafOrdering(Enum):
+    """
+    The method used to order the leaves of the dendrogram.
+    DEFAULT - The order given by the linkage.
+    OPTIMAL - The distance between adjacent leaves is minimised (slow).
+    FAST - Each link is flipped to minimise the distance between the adjacent leaves of its children.
+    """
+    DEFAULT = 'default'
+    OPTIMAL = 'optimal'
+    FAST = 'fast'
+
+
+class HierarchicalClustering(BaseModel):
+    """
+    The result of hierarchically clustering one axis of a matrix.
+    The linkage is in the scipy format, and the leaves are the indices of
+    each row (or column) in the order they are displayed.
+    """
+    linkage: List[List[float]]
+    leaves: List[int]
+
+    @classmethod
+    @cache_by('matrix_hash', 'labels', 'axis', 'metric', 'method', 'leaf_ordering')
+    def from_matrix(
+            cls,
+            data: np.ndarray,
+            matrix_hash: str,
+            labels: Tuple[List[str], List[str]],
+            axis: ClusterAxis,
+            metric: str = 'euclidean',
+            method: str = 'complete',
+            leaf_ordering: LeafOrdering = LeafOrdering.DEFAULT,
+    ):
+        """
+        Cluster the rows (or columns) of the data. The matrix hash and the row
+        and column labels identify the data, these are used to cache the result
+        (persisting between sessions).
+        """
+        if axis is ClusterAxis.COLUMNS:
+            data = data.T
+        data = np.asarray(data, dtype=np.float64)
+        linkage = sch.linkage(
+            pdist(data, metric=metric),
+            method=method,
+            optimal_ordering=leaf_ordering is LeafOrdering.OPTIMAL
+        )
+        if leaf_ordering is LeafOrdering.FAST:
+            linkage = fast_leaf_ordering(linkage, data, metric)
+        return cls(linkage=linkage.tolist(), leaves=sch.leaves_list(linkage).tolist())
+
+    def get_leaf_positions(self) -> List[float]:
+        """
+        Returns the position of each leaf along the axis (in display order).
+        """
+        return [float(LEAF_SPACING * i + LEAF_SPACING / 2) for i in range(len(self.leaves))]
+
+    def get_dendrogram_traces(self) -> List[dict]:
+        """
+        Returns the dendrogram as a single trace, where each link is separated
+        by None. The leaves are at y=0.
+        """
+        n_leaves = len(self.leaves)
+        if n_leaves < 2:
+            return list()
+
+        # The children of each link are always created before the link itself
+        node_x = np.zeros(2 * n_leaves - 1)
+        node_x[self.leaves] = self.get_leaf_positions()
+        node_height = np.zeros(2 * n_leaves - 1)
+        x_coords, y_coords = list(), list()
+        for i, (left, right, height, _) in enumerate(self.linkage):
+            left, right = int(left), int(right)
+            x_left, x_right = float(node_x[left]), float(node_x[right])
+            x_coords.extend((x_left, x_left, x_right, x_right, None))
+            y_coords.extend((float(node_height[left]), height, height, float(node_height[right]), None))
+            node_x[n_leaves + i] = (x_left + x_right) / 2
+            node_height[n_leaves + i] = height
+
+        return [
+            dict(
+                type='scatter',
+                x=x_coords,
+                y=y_coords,
+                mode='lines',
+                marker=dict(color=DENDROGRAM_COLOR),
+                line=dict(width=DENDROGRAM_LINE_WIDTH),
+            )
+        ]
+
+
+def fast_leaf_ordering(linkage: np.ndarray, data: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Approximate the optimal leaf ordering in linear time. Working up from the
+    leaves, each child of a link is flipped (reversing the order of its leaves)
+    if that brings the leaves where the two children meet closer together.
+
+    Returns a copy of the linkage with the children swapped where required.
+    """
+    n_leaves = linkage.shape[0] + 1
+    linkage = linkage.copy()
+
+    # The leaves at either end of each node, and the flips chosen at each link
+    ends = [(x, x) for x in range(n_leaves)]
+    flips = np.zeros((n_leaves - 1, 2), dtype=bool)
+    for i, (left, right) in enumerate(linkage[:, :2].astype(int)):
+        (left_first, left_last), (right_first, right_last) = ends[left], ends[right]
+
+        # Compare the distance between each end of the left and right children
+        dist = cdist(data[[left_last, left_first]], data[[right_first, right_last]], metric=metric)
+        flip_left, flip_right = np.unravel_index(np.argmin(dist), dist.shape)
+        flips[i] = flip_left, flip_right
+        ends.append((
+            left_last if flip_left else left_first,
+            right_first if flip_right else right_last
+        ))
+
+    # Working down from the root, a link is reversed if an odd number of its
+    # ancestors were flipped. Reversing a link swaps its children.
+    reverse = np.zeros(2 * n_leaves - 1, dtype=bool)
+    for i in range(n_leaves - 2, -1, -1):
+        left, right = linkage[i, :2].astype(int)
+        node_reversed = reverse[n_leaves + i]
+        reverse[left] = flips[i, 0] ^ node_reversed
+        reverse[right] = flips[i, 1] ^ node_reversed
+        if node_reversed:
+            linkage[i, [0, 1]] = linkage[i, [1, 0]]
+    return linkage
@@ -1,11 +1,12 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Collection, Optional, Tuple
 
 import pandas as pd
 from pydantic import BaseModel
 
 from indizio.models.upload.upload_file import UploadFormItem
-from indizio.util.files import to_pickle_df, from_pickle_df, get_delimiter
+from indizio.util.cache import cache_by
+from indizio.util.files import to_npy_df, from_npy_df, get_delimiter, MODEL_CACHE
 
 
 class DistanceMatrixFile(BaseModel):
@@ -22,6 +23,7 @@ class DistanceMatrixFile(BaseModel):
     n_rows: int
 
     @classmethod
+    @cache_by('data')
     def from_upload_data(cls, data: UploadFormItem):
         """
         Convert the data from the upload form store into a distance matrix file
@@ -30,7 +32,7 @@ class DistanceMatrixFile(BaseModel):
         df = pd.read_table(data.path, sep=delimiter, index_col=0)
         min_value = float(df.min().min())
         max_value = float(df.max().max())
-        path, md5 = to_pickle_df(df)
+        path, md5 = to_npy_df(df)
         return cls(
             file_name=data.file_name,
             file_id=data.name,
@@ -44,9 +46,16 @@ class DistanceMatrixFile(BaseModel):
 
     def read(self) -> pd.DataFrame:
         """
-        Read the distance matrix from disk.
+        Read the distance matrix from disk (memory-mapped).
         """
-        return from_pickle_df(self.path)
+        return MODEL_CACHE.get(self.hash, self.path, lambda: from_npy_df(self.path))
+
+    def read_subset(self, rows: Optional[Collection[str]] = None, cols: Optional[Collection[str]] = None) -> pd.DataFrame:
+        """
+        Read only the rows and columns of the distance matrix that are present
+        in the collections provided (all are read if None).
+        """
+        return from_npy_df(self.path, rows=rows, cols=cols)
 
     def get_min_max(self) -> Tuple[float, float]:
         """
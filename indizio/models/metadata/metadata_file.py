@@ -5,7 +5,8 @@ import pandas as pd
 from pydantic import BaseModel
 
 from indizio.models.upload.upload_file import UploadFormItem
-from indizio.util.files import to_pickle_df, from_pickle_df, get_delimiter
+from indizio.util.cache import cache_by
+from indizio.util.files import to_pickle_df, from_pickle_df, get_delimiter, MODEL_CACHE
 
 
 class MetadataFile(BaseModel):
@@ -20,6 +21,7 @@ class MetadataFile(BaseModel):
     n_rows: int
 
     @classmethod
+    @cache_by('data')
     def from_upload_data(cls, data: UploadFormItem):
         """
         Create a metadata file from the upload data.
@@ -47,4 +49,4 @@ class MetadataFile(BaseModel):
         return out
 
     def read(self) -> pd.DataFrame:
-        return from_pickle_df(self.path)
+        return MODEL_CACHE.get(self.hash, self.path, lambda: from_pickle_df(self.path))
@@ -0,0 +1,315 @@
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from indizio.models.common.boolean import BooleanAllAny, BooleanShowHide
+from indizio.models.common.bound import Bound
+from indizio.models.distance_matrix.dm_file import DistanceMatrixFile
+from indizio.store.network.parameters import NetworkFormStoreModel
+from indizio.util.files import to_npy_dir, from_npy_dir, to_label_array
+
+
+class EdgeTable:
+    """
+    A columnar representation of the edges in the distance matrix graph.
+
+    Each edge is stored once as a (row, col) pair of indices into the sorted
+    node array (row <= col). The value for each distance matrix is stored as
+    a contiguous float32 column that is aligned to the shared edge index, a
+    NaN value indicates that the matrix does not contain that edge.
+    """
+
+    def __init__(self, nodes: np.ndarray, row: np.ndarray, col: np.ndarray, values: Dict[str, np.ndarray]):
+        self.nodes = nodes
+        self.row = row
+        self.col = col
+        self.values = values
+
+    @classmethod
+    def from_distance_matrices(
+            cls,
+            matrices: Collection[DistanceMatrixFile],
+            min_value: Optional[float] = None,
+            top_k: Optional[int] = None
+    ):
+        """
+        Extract the upper triangle of each distance matrix into a shared edge index.
+
+        For large matrices, the edges can be restricted to those with a value of
+        at least min_value, and/or the top_k largest values for each node.
+        """
+        frames = [(dm.file_id, dm.read()) for dm in matrices]
+
+        # Create a sorted index of all nodes seen across all matrices
+        all_nodes = set()
+        for _, df in frames:
+            all_nodes.update(df.index)
+            all_nodes.update(df.columns)
+        node_index = pd.Index(sorted(all_nodes))
+        n_nodes = len(node_index)
+
+        # Extract the edges present in the upper triangle of each matrix
+        d_file_to_edges = dict()
+        for file_id, df in frames:
+            row_idx, col_idx, edge_values = extract_edges(df.to_numpy(), min_value, top_k)
+
+            # Sort the keys to ensure that a/b is always used instead of b/a
+            node_a = node_index.get_indexer(df.index)[row_idx].astype(np.int64)
+            node_b = node_index.get_indexer(df.columns)[col_idx].astype(np.int64)
+            keys = np.minimum(node_a, node_b) * n_nodes + np.maximum(node_a, node_b)
+
+            # Should the same pair appear twice, the last value takes precedence
+            keys, idx_last = np.unique(keys[::-1], return_index=True)
+            d_file_to_edges[file_id] = (keys, edge_values[::-1][idx_last])
+
+        # Align the values from each matrix to the shared edge index
+        all_keys = np.unique(np.concatenate([x[0] for x in d_file_to_edges.values()] or [np.zeros(0, np.int64)]))
+        d_file_to_values = dict()
+        for file_id, (keys, edge_values) in d_file_to_edges.items():
+            column = np.full(len(all_keys), np.nan, dtype=np.float32)
+            column[np.searchsorted(all_keys, keys)] = edge_values
+            d_file_to_values[file_id] = column
+
+        return cls(
+            nodes=to_label_array(node_index),
+            row=(all_keys // max(n_nodes, 1)).astype(np.int32),
+            col=(all_keys % max(n_nodes, 1)).astype(np.int32),
+            values=d_file_to_values
+        )
+
+    def save(self) -> Tuple[Path, str]:
+        """
+        Write the edge table to disk as a directory of .npy files.
+        """
+        file_ids = list(self.values.keys())
+        values = np.vstack([self.values[x] for x in file_ids]) if file_ids else np.zeros((0, 0), np.float32)
+        return to_npy_dir({
+            'nodes': self.nodes,
+            'row': self.row,
+            'col': self.col,
+            'file_ids': to_label_array(file_ids).astype(str),
+            'values': values,
+        })
+
+    @classmethod
+    def load(cls, path: Path):
+        """
+        Read the edge table from disk.
+        """
+        arrays = from_npy_dir(path, mmap_mode='r')
+        return cls(
+            nodes=arrays['nodes'],
+            row=arrays['row'],
+            col=arrays['col'],
+            values={str(k): v for k, v in zip(arrays['file_ids'], arrays['values'])}
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.row)
+
+    def get_node_labels(self) -> List[str]:
+        return self.nodes.tolist()
+
+    def degree(self) -> np.ndarray:
+        """
+        Returns the degree of each node, edges to self are counted twice
+        to be consistent with NetworkX.
+        """
+        return (np.bincount(self.row, minlength=self.n_nodes) +
+                np.bincount(self.col, minlength=self.n_nodes))
+
+    def to_csr(self, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the adjacency of the edges selected by the mask in CSR format,
+        i.e. the neighbours of node i are indices[indptr[i]:indptr[i + 1]].
+        Each edge is stored in both directions (once for edges to self), the
+        index of the edge for each neighbour is also returned.
+        """
+        idx_edges = np.arange(self.n_edges) if mask is None else np.flatnonzero(mask)
+        row, col = self.row[idx_edges], self.col[idx_edges]
+        not_self = row != col
+
+        source = np.concatenate([row, col[not_self]])
+        target = np.concatenate([col, row[not_self]])
+        edge_index = np.concatenate([idx_edges, idx_edges[not_self]])
+
+        order = np.argsort(source, kind='stable')
+        indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=self.n_nodes), out=indptr[1:])
+        return indptr, target[order], edge_index[order]
+
+    def degree_filter_mask(self, mask: np.ndarray, min_degree: float, max_degree: float) -> np.ndarray:
+        """
+        Keep the nodes (connected to a selected edge) with a degree in the range,
+        and their neighbours. Returns a mask of the selected edges between those
+        nodes. Edges to self are counted twice to be consistent with NetworkX.
+        """
+        indptr, indices, edge_index = self.to_csr(mask)
+        n_neighbours = np.diff(indptr)
+        degree = n_neighbours + np.bincount(indices[self.row[edge_index] == self.col[edge_index]],
+                                            minlength=self.n_nodes)
+
+        in_range = (n_neighbours > 0) & (degree >= min_degree) & (degree <= max_degree)
+        keep = in_range.copy()
+        keep[indices[np.repeat(in_range, n_neighbours)]] = True
+        return mask & keep[self.row] & keep[self.col]
+
+    def get_min_max(self, file_id: str, fill_value: Optional[float] = None) -> Tuple[float, float]:
+        """
+        Returns the minimum and maximum value of the edges for a matrix.
+        Missing values are ignored, unless a fill value is specified.
+        """
+        values = self.values[file_id]
+        if fill_value is not None:
+            values = np.where(np.isnan(values), np.float32(fill_value), values)
+        return float(np.nanmin(values)), float(np.nanmax(values))
+
+    def to_networkx(self, mask: Optional[np.ndarray] = None) -> nx.Graph:
+        """
+        Create a NetworkX graph from the edges selected by the mask.
+        If no mask is provided then all nodes and edges are included, otherwise
+        only those nodes connected to a selected edge are included.
+        """
+        if mask is None:
+            idx_edges = np.arange(self.n_edges)
+            idx_nodes = np.arange(self.n_nodes)
+        else:
+            idx_edges = np.flatnonzero(mask)
+            idx_nodes = np.unique(np.concatenate([self.row[idx_edges], self.col[idx_edges]]))
+
+        # Convert the float32 values to the shortest float representation
+        # (i.e. 0.9 instead of 0.8999999761581421) for display purposes
+        nodes = self.nodes.tolist()
+        edge_values = {
+            k: v[idx_edges].astype(str).astype(np.float64).tolist()
+            for k, v in self.values.items()
+        }
+
+        G = nx.Graph()
+        G.add_nodes_from(nodes[i] for i in idx_nodes)
+        for i, (idx_row, idx_col) in enumerate(zip(self.row[idx_edges], self.col[idx_edges])):
+            attrs = {k: v[i] for k, v in edge_values.items() if v[i] == v[i]}
+            G.add_edge(nodes[idx_row], nodes[idx_col], **attrs)
+        return G
+
+    def filter_mask(self, params: NetworkFormStoreModel) -> np.ndarray:
+        """
+        Evaluates the thresholds, matching and edges to self parameters against
+        every edge at once. Returns a boolean mask of the edges to keep.
+        """
+
+        # Only consider edges connected to the nodes of interest (if specified)
+        if params.node_of_interest:
+            idx_of_interest = np.flatnonzero(np.isin(self.nodes, params.node_of_interest))
+            mask = np.isin(self.row, idx_of_interest) | np.isin(self.col, idx_of_interest)
+        else:
+            mask = np.ones(self.n_edges, dtype=bool)
+
+        # Skip edges from self if applicable
+        if params.show_edges_to_self is BooleanShowHide.HIDE:
+            mask &= self.row != self.col
+
+        # Process each metric used to construct the edge to check bounds,
+        # a missing value (NaN) will never satisfy the comparison.
+        # The thresholds are compared at the same precision as the values.
+        edge_matches = list()
+        edge_missing = list()
+        for file_id, values in self.values.items():
+            cur_threshold = params.thresholds[file_id]
+            left_value = np.float32(cur_threshold.left_value)
+            right_value = np.float32(cur_threshold.right_value)
+
+            if cur_threshold.left_bound is Bound.INCLUSIVE:
+                meets_lower = values >= left_value
+            else:
+                meets_lower = values > left_value
+
+            if cur_threshold.right_bound is Bound.INCLUSIVE:
+                meets_upper = values <= right_value
+            else:
+                meets_upper = values < right_value
+
+            edge_matches.append(meets_lower & meets_upper)
+            edge_missing.append(np.isnan(values))
+
+        # Depending on the filtering type, check if we should keep the edge
+        # Note that only those metrics which define the edge are considered
+        if len(edge_matches) > 0:
+            edge_matches = np.vstack(edge_matches)
+            if params.thresh_matching is BooleanAllAny.ALL:
+                mask &= np.all(edge_matches | np.vstack(edge_missing), axis=0)
+            elif params.thresh_matching is BooleanAllAny.ANY:
+                mask &= np.any(edge_matches, axis=0)
+        return mask
+
+
+def extract_edges(
+        values: np.ndarray,
+        min_value: Optional[float] = None,
+        top_k: Optional[int] = None,
+        block_cells: int = 2 ** 24
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the (row, col, value) of each non-NaN edge in the upper triangle
+    of a square matrix. The matrix is processed in blocks of rows.
+
+    If min_value is set, then only edges with a value of at least min_value are kept.
+    If top_k is set, then an edge is kept if it is one of the top_k largest values
+    for either node (edges to self are always kept).
+    """
+    n_rows, n_cols = values.shape
+    block_rows = max(1, block_cells // max(n_cols, 1))
+    if top_k is not None and n_rows != n_cols:
+        raise ValueError('The top-k edges can only be extracted from a square matrix.')
+
+    out_rows, out_cols = list(), list()
+    for start in range(0, n_rows, block_rows):
+        block = np.asarray(values[start:start + block_rows], dtype=np.float32)
+        block_idx = np.arange(start, start + len(block))
+
+        if top_k is None:
+            # Keep the upper triangle
+            mask = np.arange(n_cols)[None, :] >= block_idx[:, None]
+            if min_value is not None:
+                mask &= block >= np.float32(min_value)
+            rows, cols = np.nonzero(mask & ~np.isnan(block))
+            out_rows.append(rows + start)
+            out_cols.append(cols)
+        else:
+            # Select the largest values for each row (excluding self and NaN)
+            ranked = np.where(np.isnan(block), -np.inf, block)
+            ranked[np.arange(len(block)), block_idx] = -np.inf
+            k = min(top_k, n_cols)
+            cols = np.argpartition(-ranked, k - 1, axis=1)[:, :k] if k > 0 else np.zeros((len(block), 0), np.int64)
+            rows = np.repeat(block_idx, k)
+            cols = cols.ravel()
+            keep = np.isfinite(ranked[rows - start, cols])
+
+            # Edges are moved to the upper triangle, as either node may have selected it
+            out_rows.append(np.minimum(rows[keep], cols[keep]))
+            out_cols.append(np.maximum(rows[keep], cols[keep]))
+            out_rows.append(block_idx)
+            out_cols.append(block_idx)
+
+    rows = np.concatenate(out_rows) if out_rows else np.zeros(0, np.int64)
+    cols = np.concatenate(out_cols) if out_cols else np.zeros(0, np.int64)
+
+    # Remove duplicates and apply the minimum value to the upper triangle values
+    if top_k is not None:
+        keys = np.unique(rows.astype(np.int64) * n_cols + cols)
+        rows, cols = keys // max(n_cols, 1), keys % max(n_cols, 1)
+        edge_values = np.asarray(values[rows, cols], dtype=np.float32)
+        keep = ~np.isnan(edge_values)
+        if min_value is not None:
+            keep &= edge_values >= np.float32(min_value)
+        return rows[keep], cols[keep], edge_values[keep]
+
+    return rows, cols, np.asarray(values[rows, cols], dtype=np.float32)
@@ -0,0 +1,115 @@
+import math
+from typing import Dict, List
+
+import networkx as nx
+import numpy as np
+
+from indizio.models.network.parameters import NetworkFormLayoutOption
+
+# The approximate distance between nodes (in pixels)
+NODE_SPACING = 60
+
+
+def compute_node_positions(graph: nx.Graph, layout: NetworkFormLayoutOption) -> Dict[str, Dict[str, float]]:
+    """
+    Compute the position of each node in the graph on the server.
+
+    Each connected component is laid out separately, the components are then
+    packed into rows (largest first) so that they do not overlap. Each
+    component is given an area proportional to the number of nodes.
+    """
+    if layout is NetworkFormLayoutOption.spring:
+        layout_fn = force_directed_layout
+    elif layout is NetworkFormLayoutOption.spectral:
+        layout_fn = spectral_layout
+    else:
+        raise ValueError(f'The layout {layout.value} is not computed on the server.')
+
+    components = sorted((sorted(x) for x in nx.connected_components(graph)), key=len, reverse=True)
+    row_width = 1.5 * math.sqrt(graph.number_of_nodes())
+
+    out = dict()
+    x, y, row_height = 0.0, 0.0, 0.0
+    for nodes in components:
+        side = math.sqrt(len(nodes))
+        if x > 0 and x + side > row_width:
+            x, y, row_height = 0.0, y + row_height, 0.0
+
+        # Scale the positions from [-1, 1] to the area of this component
+        positions = (layout_fn(graph.subgraph(nodes), nodes) + 1) / 2 * side + (x, y)
+        for node, (node_x, node_y) in zip(nodes, positions):
+            out[node] = {'x': round(float(node_x) * NODE_SPACING, 1), 'y': round(float(node_y) * NODE_SPACING, 1)}
+
+        x += side + 1
+        row_height = max(row_height, side + 1)
+    return out
+
+
+def spectral_layout(graph: nx.Graph, nodes: List[str]) -> np.ndarray:
+    """
+    Position the nodes using the eigenvectors of the graph Laplacian, scaled to [-1, 1].
+    """
+    if len(nodes) == 1:
+        return np.zeros((1, 2))
+    if len(nodes) == 2:
+        return np.array([[-1.0, 0.0], [1.0, 0.0]])
+    positions = nx.spectral_layout(graph, weight=None)
+    return nx.rescale_layout(np.array([positions[x] for x in nodes], dtype=np.float64))
+
+
+def force_directed_layout(
+        graph: nx.Graph,
+        nodes: List[str],
+        iterations: int = 50,
+        max_samples: int = 1000,
+        block_size: int = 256,
+        seed: int = 42
+) -> np.ndarray:
+    """
+    Position the nodes using the Fruchterman-Reingold algorithm, scaled to [-1, 1].
+    The nodes start from the spectral layout.
+
+    All forces are computed with array operations. The repulsive force is
+    calculated against at most max_samples nodes each iteration (scaled to the
+    number of nodes), so each iteration is linear in the number of nodes.
+    """
+    n_nodes = len(nodes)
+    if n_nodes < 3:
+        return spectral_layout(graph, nodes)
+    rng = np.random.default_rng(seed)
+
+    # Start from the spectral layout (jittered, as nodes may share a position) in [0, 1]
+    pos = (spectral_layout(graph, nodes) + 1) / 2
+    pos += rng.uniform(-1e-3, 1e-3, pos.shape)
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None, format='coo')
+    row, col = adjacency.row, adjacency.col
+
+    k = math.sqrt(1 / n_nodes)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = np.zeros_like(pos)
+
+        # Repulsion between all pairs of nodes (k^2 / distance)
+        if n_nodes > max_samples:
+            samples = pos[rng.choice(n_nodes, max_samples, replace=False)]
+            scale = n_nodes / max_samples
+        else:
+            samples, scale = pos, 1.0
+        for start in range(0, n_nodes, block_size):
+            delta = pos[start:start + block_size, None, :] - samples[None, :, :]
+            distance_sq = np.maximum(np.einsum('ijk,ijk->ij', delta, delta), 1e-6)
+            displacement[start:start + block_size] += scale * k * k * np.einsum('ijk,ij->ik', delta, 1 / distance_sq)
+
+        # Attraction along each edge (distance^2 / k)
+        delta = pos[row] - pos[col]
+        force = delta * (np.sqrt(np.einsum('ij,ij->i', delta, delta)) / k)[:, None]
+        displacement[:, 0] -= np.bincount(row, force[:, 0], minlength=n_nodes)
+        displacement[:, 1] -= np.bincount(row, force[:, 1], minlength=n_nodes)
+
+        # Move each node by at most the temperature
+        length = np.maximum(np.sqrt(np.einsum('ij,ij->i', displacement, displacement)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return nx.rescale_layout(pos)
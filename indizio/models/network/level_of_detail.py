@@ -0,0 +1,136 @@
+import heapq
+import math
+from typing import Collection, Dict, List, Set, Tuple
+
+import networkx as nx
+
+from indizio.util.hashing import calc_md5
+
+
+def partition_graph(graph: nx.Graph, max_groups: int, max_group_size: int) -> List[List[str]]:
+    """
+    Partition the nodes of the graph into at most max_groups groups.
+
+    Each connected component is a group, unless it has more than max_group_size
+    nodes, in which case it is split into communities (label propagation).
+    Should there be too many groups, the smallest are merged together.
+    """
+    groups = list()
+    for component in nx.connected_components(graph):
+        if len(component) <= max_group_size:
+            groups.append(component)
+        else:
+            groups.extend(split_component(graph, component, max_group_size))
+
+    # Merge the two smallest groups until there are few enough
+    heap = [(len(x), i, x) for i, x in enumerate(groups)]
+    heapq.heapify(heap)
+    n_merged = len(heap)
+    while len(heap) > max(max_groups, 1):
+        size_a, _, group_a = heapq.heappop(heap)
+        size_b, _, group_b = heapq.heappop(heap)
+        heapq.heappush(heap, (size_a + size_b, n_merged, group_a | group_b))
+        n_merged += 1
+
+    return sorted((sorted(x) for _, _, x in heap), key=lambda x: (-len(x), x[0]))
+
+
+def split_component(graph: nx.Graph, nodes: Set[str], max_group_size: int) -> List[Set[str]]:
+    """
+    Split the nodes into communities of at most max_group_size nodes.
+    Should a community not be split any further, the nodes are divided in order.
+    """
+    communities = list(nx.community.asyn_lpa_communities(graph.subgraph(nodes), seed=42))
+    if len(communities) == 1:
+        nodes = sorted(nodes)
+        return [set(nodes[i:i + max_group_size]) for i in range(0, len(nodes), max_group_size)]
+
+    out = list()
+    for community in communities:
+        if len(community) <= max_group_size:
+            out.append(community)
+        else:
+            out.extend(split_component(graph, community, max_group_size))
+    return out
+
+
+def get_group_id(nodes: Collection[str]) -> str:
+    """
+    Returns an identifier for the group, this is the same for the same nodes.
+    """
+    return f'group-{calc_md5(chr(0).join(sorted(nodes)).encode())[:12]}'
+
+
+def collapse_graph(
+        graph: nx.Graph,
+        groups: List[List[str]],
+        expanded: List[str],
+        max_expanded_nodes: int,
+        max_edges: int
+) -> nx.Graph:
+    """
+    Collapse each group of nodes into a single node (unless it is expanded),
+    the edges between groups are summarised as a single edge with the number
+    of edges, and the maximum value of each attribute.
+
+    At most max_edges edges are kept. The edges between nodes that are shown
+    come first (those with the largest value, should there be too many), the
+    remainder are the summaries with the most edges.
+
+    The most recently expanded groups (last) are kept expanded, up to a total
+    of max_expanded_nodes. Each node of an expanded group has the group id as
+    an attribute, and the group is shown as an unconnected node that is used
+    to collapse it again.
+    """
+    d_group_to_nodes = {get_group_id(x): x for x in groups}
+
+    # Keep the most recently expanded groups, until the limit is reached
+    expanded_groups = set()
+    n_expanded = 0
+    for group_id in reversed(expanded):
+        nodes = d_group_to_nodes.get(group_id)
+        if nodes is None or group_id in expanded_groups:
+            continue
+        if n_expanded + len(nodes) > max_expanded_nodes:
+            break
+        expanded_groups.add(group_id)
+        n_expanded += len(nodes)
+
+    # Determine what each node will be displayed as
+    out = nx.Graph()
+    d_node_to_display = dict()
+    for group_id, nodes in d_group_to_nodes.items():
+        if len(nodes) == 1:
+            out.add_nodes_from(nodes)
+            d_node_to_display.update({x: x for x in nodes})
+        elif group_id in expanded_groups:
+            out.add_nodes_from(nodes, group=group_id)
+            out.add_node(group_id, name=f'Collapse {len(nodes):,} nodes', n_nodes=len(nodes), expanded=True, size=0)
+            d_node_to_display.update({x: x for x in nodes})
+        else:
+            out.add_node(group_id, name=f'{len(nodes):,} nodes', n_nodes=len(nodes),
+                         size=round(min(100.0, 20 * math.log10(len(nodes)) + 20), 2))
+            d_node_to_display.update({x: group_id for x in nodes})
+
+    # Summarise the edges between groups
+    edges = list()
+    d_summary: Dict[Tuple[str, str], dict] = dict()
+    for node_a, node_b, attrs in graph.edges(data=True):
+        display_a, display_b = d_node_to_display[node_a], d_node_to_display[node_b]
+        if display_a == node_a and display_b == node_b:
+            edges.append((node_a, node_b, attrs))
+        elif display_a != display_b:
+            summary = d_summary.setdefault(tuple(sorted((display_a, display_b))), {'n_edges': 0})
+            summary['n_edges'] += 1
+            for key, value in attrs.items():
+                summary[key] = max(summary.get(key, value), value)
+
+    # Keep the edges with the largest value, then fill the remainder with summaries
+    if len(edges) > max_edges:
+        edges.sort(key=lambda x: (-max(x[2].values(), default=0), x[0], x[1]))
+        del edges[max_edges:]
+    out.add_edges_from(edges)
+    summaries = sorted(d_summary.items(), key=lambda x: (-x[1]['n_edges'], x[0]))
+    for (display_a, display_b), summary in summaries[:max_edges - len(edges)]:
+        out.add_edge(display_a, display_b, **summary)
+    return out
@@ -30,6 +30,22 @@ class NetworkFormLayoutOption(HtmlOption):
     klay = 'Klay'
     spread = 'Spread'
     euler = 'Euler'
+    spring = 'Force-directed (server)'
+    spectral = 'Spectral (server)'
+
+    def is_server_side(self) -> bool:
+        """
+        True if the node positions are computed on the server (sent as a preset layout).
+        """
+        return self in {NetworkFormLayoutOption.spring, NetworkFormLayoutOption.spectral}
+
+
+class NetworkRenderer(HtmlOption):
+    """
+    This class represents the components that can be used to draw the network graph.
+    """
+    CYTOSCAPE = 'Cytoscape'
+    WEBGL = 'WebGL (large graphs)'
 
 
 class NetworkParamThreshold(BaseModel):
@@ -20,6 +20,15 @@ class NetworkVizStyleSheet:
         "edge": {
             "opacity": 0.4
         },
+        "node[n_nodes]": {
+            "shape": "round-rectangle",
+            "border-width": 2,
+            "border-color": "#848484",
+        },
+        "node[expanded]": {
+            "border-style": "dashed",
+            "background-opacity": 0.2,
+        },
     }
 
     def __init__(self, data=None):
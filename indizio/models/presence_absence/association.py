@@ -0,0 +1,147 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from indizio.models.common.html_option import HtmlOption
+from indizio.util.correlation import pearson_corr, cooccurrence_metric, jaccard_index, mutual_information, \
+    abs_log_odds_ratio, phi_coefficient
+from indizio.util.types import ProgressFn
+
+
+class AssociationMetric(HtmlOption):
+    """
+    These are the metrics that can be used to create a matrix from a presence/absence file.
+    """
+
+    PEARSON = 'Pearson Corr.'
+    SPEARMAN = 'Spearman Corr.'
+    JACCARD = 'Jaccard'
+    MUTUAL_INFO = 'Mutual Information'
+    ODDS_RATIO = 'Log Odds Ratio'
+
+
+class Association(ABC):
+    """
+    Computes the association between each pair of columns in a presence/absence
+    matrix. Each metric declares the range of values it can produce, this is
+    only used if the resulting matrix has no values.
+
+    Subclasses are added to the registry using the register_association decorator.
+    """
+    metric: AssociationMetric
+
+    @abstractmethod
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        """
+        Returns the minimum and maximum value for a matrix with this many rows.
+        """
+        pass
+
+    @abstractmethod
+    def compute(
+            self,
+            df: pd.DataFrame,
+            is_binary: bool,
+            out: np.ndarray,
+            progress: Optional[ProgressFn] = None
+    ) -> np.ndarray:
+        """
+        Compute the (n_cols x n_cols) association matrix into the output array.
+        """
+        pass
+
+
+ASSOCIATIONS: Dict[AssociationMetric, Association] = dict()
+
+
+def register_association(cls):
+    """
+    Add an association metric to the registry.
+    """
+    ASSOCIATIONS[cls.metric] = cls()
+    return cls
+
+
+@register_association
+class PearsonAssociation(Association):
+    """
+    The absolute Pearson correlation (the phi coefficient for binary data).
+    """
+    metric = AssociationMetric.PEARSON
+
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        return 0.0, 1.0
+
+    def compute(self, df, is_binary, out, progress=None):
+        if is_binary:
+            cooccurrence_metric(df.to_numpy(), phi_coefficient, out, progress=progress)
+        elif df.isna().to_numpy().any():
+            out[:] = df.corr().to_numpy()
+        else:
+            pearson_corr(df.to_numpy(), out, progress=progress)
+        return np.abs(out, out=out)
+
+
+@register_association
+class SpearmanAssociation(Association):
+    """
+    The absolute Spearman correlation (the Pearson correlation of the ranks).
+    """
+    metric = AssociationMetric.SPEARMAN
+
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        return 0.0, 1.0
+
+    def compute(self, df, is_binary, out, progress=None):
+        if df.isna().to_numpy().any():
+            out[:] = df.corr(method='spearman').to_numpy()
+        else:
+            pearson_corr(rankdata(df.to_numpy(), axis=0), out, progress=progress)
+        return np.abs(out, out=out)
+
+
+@register_association
+class JaccardAssociation(Association):
+    """
+    The Jaccard index of the rows where each column is present (value > 0).
+    """
+    metric = AssociationMetric.JACCARD
+
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        return 0.0, 1.0
+
+    def compute(self, df, is_binary, out, progress=None):
+        return cooccurrence_metric(df.to_numpy(), jaccard_index, out, progress=progress)
+
+
+@register_association
+class MutualInformationAssociation(Association):
+    """
+    The mutual information (bits) between the presence (value > 0) of each column.
+    """
+    metric = AssociationMetric.MUTUAL_INFO
+
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        return 0.0, 1.0
+
+    def compute(self, df, is_binary, out, progress=None):
+        return cooccurrence_metric(df.to_numpy(), mutual_information, out, progress=progress)
+
+
+@register_association
+class OddsRatioAssociation(Association):
+    """
+    The absolute log odds ratio of co-occurrence (value > 0) for each column.
+    """
+    metric = AssociationMetric.ODDS_RATIO
+
+    def value_range(self, n_rows: int) -> Tuple[float, float]:
+        # The largest value is when the pairs are split evenly as (1,1) and (0,0)
+        return 0.0, round(2 * math.log(n_rows + 1), 10)
+
+    def compute(self, df, is_binary, out, progress=None):
+        return cooccurrence_metric(df.to_numpy(), abs_log_odds_ratio, out, progress=progress)
@@ -1,14 +1,20 @@
+import tempfile
 from pathlib import Path
+from typing import Collection, Optional
 
+import numpy as np
 import pandas as pd
 from dash import dcc
 from pydantic import BaseModel
 
-from indizio.config import PERSISTENCE_TYPE
+from indizio.config import PERSISTENCE_TYPE, TMP_DIR
 from indizio.models.distance_matrix.dm_file import DistanceMatrixFile
+from indizio.models.presence_absence.association import AssociationMetric, ASSOCIATIONS
 from indizio.models.upload.upload_file import UploadFormItem
-
-from indizio.util.files import to_pickle_df, from_pickle_df, get_delimiter
+from indizio.util.cache import cache_by
+from indizio.util.files import to_npy_df, from_npy_df, get_delimiter, MODEL_CACHE, read_numeric_table, \
+    to_packed_df, from_packed_df
+from indizio.util.types import ProgressFn
 
 
 class PresenceAbsenceFile(BaseModel):
@@ -18,54 +24,100 @@ class PresenceAbsenceFile(BaseModel):
     hash: str
     n_cols: int
     n_rows: int
+    is_binary: bool = False
 
     @classmethod
+    @cache_by('data')
     def from_upload_data(cls, data: UploadFormItem):
         """
         Convert the uploaded file data to a presence/absence file.
         """
         delimiter = get_delimiter(data.path)
-        df = pd.read_table(data.path, sep=delimiter, dtype=str)
-        df.set_index(df.columns[0], inplace=True)
-        df = df.astype(float)
-        path, md5 = to_pickle_df(df)
+        df = read_numeric_table(data.path, delimiter, detect_binary=True)
+
+        # Binary matrices are stored bit-packed (1 bit per value)
+        is_binary = bool((df.dtypes == np.uint8).all())
+        if is_binary:
+            path, md5 = to_packed_df(df)
+        else:
+            path, md5 = to_npy_df(df)
         return cls(
             file_name=data.file_name,
             file_id=data.name,
             path=path,
             hash=md5,
             n_cols=int(df.shape[1]),
-            n_rows=int(df.shape[0])
+            n_rows=int(df.shape[0]),
+            is_binary=is_binary
         )
 
     def read(self) -> pd.DataFrame:
         """
-        Return the saved P/A matrix from disk.
+        Return the saved P/A matrix from disk (memory-mapped), binary matrices
+        are unpacked to uint8.
+        """
+        if self.is_binary:
+            return MODEL_CACHE.get(self.hash, self.path, lambda: from_packed_df(self.path),
+                                   n_bytes=self.n_rows * self.n_cols)
+        return MODEL_CACHE.get(self.hash, self.path, lambda: from_npy_df(self.path))
+
+    def read_subset(self, rows: Optional[Collection[str]] = None, cols: Optional[Collection[str]] = None) -> pd.DataFrame:
+        """
+        Return only the rows and columns of the P/A matrix that are present
+        in the collections provided (all are read if None).
         """
-        return from_pickle_df(self.path)
+        if self.is_binary:
+            return from_packed_df(self.path, rows=rows, cols=cols)
+        return from_npy_df(self.path, rows=rows, cols=cols)
 
-    def as_distance_matrix(self) -> DistanceMatrixFile:
-        # Convert the dataframe to a distance matrix and compute the correlation
-        df_corr = self.read().corr().abs()
+    @cache_by('self', 'metric')
+    def as_distance_matrix(
+            self,
+            metric: AssociationMetric = AssociationMetric.PEARSON,
+            progress: Optional[ProgressFn] = None
+    ) -> DistanceMatrixFile:
+        """
+        Compute the association between each pair of columns using the metric.
+        The range of values is that observed between the columns.
+        """
+        association = ASSOCIATIONS[metric]
+        df = self.read()
+        with tempfile.TemporaryDirectory(dir=TMP_DIR) as tmp_dir:
+
+            # Large matrices are written to a memory-map to reduce memory usage
+            values = np.lib.format.open_memmap(
+                Path(tmp_dir) / 'values.npy', mode='w+', dtype=np.float64, shape=(df.shape[1], df.shape[1])
+            )
+            association.compute(df, self.is_binary, values, progress)
 
-        # Round all values within 10 decimal places of precision
-        df_corr = df_corr.round(10)
+            # Round all values within 10 decimal places of precision
+            np.round(values, 10, out=values)
 
-        # Compute the min/max
-        df_min = float(df_corr.min().min())
-        df_max = float(df_corr.max().max())
+            # The observed range of values between columns (NaN if there are none),
+            # the association of a column with itself is excluded
+            diagonal = values.diagonal().copy()
+            np.fill_diagonal(values, np.nan)
+            min_value = float(np.fmin.reduce(values, axis=None, initial=np.nan))
+            max_value = float(np.fmax.reduce(values, axis=None, initial=np.nan))
+            np.fill_diagonal(values, diagonal)
 
-        # Store the correlation matrix on disk
-        path, md5 = to_pickle_df(df_corr)
+            df_assoc = pd.DataFrame(values, index=df.columns, columns=df.columns, copy=False)
 
-        # Create the distance matrix
+            # Store the association matrix on disk
+            path, md5 = to_npy_df(df_assoc)
+            del df_assoc, values
+
+        # Create the distance matrix (using the declared range if there are no values)
+        if np.isnan(min_value):
+            min_value, max_value = association.value_range(int(df.shape[0]))
+        name = f'{self.file_id if self.file_id else self.file_name} ({metric.value})'
         return DistanceMatrixFile(
-            file_name=f'{self.file_id if self.file_id else self.file_name} (Pearson Corr.)',
-            file_id=f'{self.file_id if self.file_id else self.file_name} (Pearson Corr.)',
+            file_name=name,
+            file_id=name,
             path=path,
             hash=md5,
-            min_value=df_min,
-            max_value=df_max,
-            n_cols=int(df_corr.shape[1]),
-            n_rows=int(df_corr.shape[0])
+            min_value=min_value,
+            max_value=max_value,
+            n_cols=int(df.shape[1]),
+            n_rows=int(df.shape[1])
         )
@@ -0,0 +1,146 @@
+from pathlib import Path
+from typing import Collection, List, Tuple
+
+import dendropy
+import numpy as np
+
+from indizio.util.files import to_npy_dir, from_npy_dir, to_label_array
+from indizio.util.newick import parse_newick
+
+
+class TreeArray:
+    """
+    A compact representation of a tree, where each node is an index into the
+    arrays. The nodes are in pre-order, i.e. a parent is always before its
+    children, and the children of a node are in order.
+
+    parent - The index of the parent node (-1 for the root).
+    length - The length of the edge to the parent (NaN if missing).
+    label - The taxon label of each leaf (or the label of an internal node).
+    """
+
+    def __init__(self, parent: np.ndarray, length: np.ndarray, label: np.ndarray):
+        self.parent = parent
+        self.length = length
+        self.label = label
+
+    @classmethod
+    def from_newick(cls, path: Path):
+        """
+        Parse the tree from a Newick file (without creating a dendropy tree).
+        """
+        parent, length, label = parse_newick(path)
+        return cls(parent=parent, length=length, label=to_label_array(label).astype(str))
+
+    def save(self) -> Tuple[Path, str]:
+        """
+        Write the tree to disk as a directory of .npy files.
+        """
+        return to_npy_dir({
+            'parent': self.parent,
+            'length': self.length,
+            'label': self.label,
+        })
+
+    @classmethod
+    def load(cls, path: Path):
+        """
+        Read the tree from disk.
+        """
+        arrays = from_npy_dir(path)
+        return cls(parent=arrays['parent'], length=arrays['length'], label=arrays['label'])
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.parent)
+
+    @property
+    def n_leaves(self) -> int:
+        return int(self.is_leaf().sum())
+
+    def is_leaf(self) -> np.ndarray:
+        """
+        Returns a boolean array indicating if each node is a leaf.
+        """
+        return np.bincount(self.parent[1:], minlength=self.n_nodes) == 0
+
+    def get_leaf_labels(self) -> List[str]:
+        """
+        Returns the label of each leaf, from left to right.
+        """
+        return self.label[self.is_leaf()].tolist()
+
+    def get_root_distances(self) -> np.ndarray:
+        """
+        Returns the distance from the root to each node (missing lengths are zero).
+        """
+        parent = self.parent.tolist()
+        length = np.nan_to_num(self.length).tolist()
+        out = [0.0] * self.n_nodes
+        for i in range(1, self.n_nodes):
+            out[i] = out[parent[i]] + length[i]
+        return np.array(out, dtype=np.float64)
+
+    def extract_tree_with_labels(self, labels: Collection[str]):
+        """
+        Returns a copy of the tree with only the leaves that have these labels.
+        Nodes with a single child are removed and their edge is merged into
+        the child's edge (as in dendropy).
+        """
+        keep = self.is_leaf() & np.isin(self.label, list(labels))
+        if not keep.any():
+            raise ValueError('None of the labels are present in the tree.')
+
+        # Count the number of children that are kept for each node (children first)
+        parents = self.parent.tolist()
+        n_kept = keep.astype(np.int32).tolist()
+        n_children_kept = [0] * self.n_nodes
+        for i in range(self.n_nodes - 1, 0, -1):
+            if n_kept[i] > 0:
+                n_kept[parents[i]] += n_kept[i]
+                n_children_kept[parents[i]] += 1
+
+        # Nodes with a single child are suppressed, the child takes their place
+        lengths = self.length.tolist()
+        new_idx = [-1] * self.n_nodes
+        parent, length, nodes = list(), list(), list()
+        for i in np.flatnonzero(n_kept).tolist():
+            if n_children_kept[i] == 1:
+                continue
+
+            # Find the nearest ancestor that is not suppressed, merging the edges
+            cur_length = lengths[i]
+            cur_parent = parents[i]
+            while cur_parent >= 0 and n_children_kept[cur_parent] == 1:
+                cur_length = np.nansum((cur_length, lengths[cur_parent]))
+                cur_parent = parents[cur_parent]
+
+            new_idx[i] = len(parent)
+            parent.append(new_idx[cur_parent] if cur_parent >= 0 else -1)
+            length.append(cur_length)
+            nodes.append(i)
+
+        return TreeArray(
+            parent=np.array(parent, dtype=np.int32),
+            length=np.array(length, dtype=np.float64),
+            label=self.label[nodes]
+        )
+
+    def to_dendropy(self) -> dendropy.Tree:
+        """
+        Convert the tree to dendropy, this should only be used when a dendropy
+        specific operation is required.
+        """
+        is_leaf = self.is_leaf()
+        taxon_namespace = dendropy.TaxonNamespace(self.label[is_leaf].tolist())
+        tree = dendropy.Tree(taxon_namespace=taxon_namespace)
+        nodes = list()
+        for i in range(self.n_nodes):
+            node = tree.seed_node if i == 0 else nodes[self.parent[i]].new_child()
+            nodes.append(node)
+            node.edge_length = None if np.isnan(self.length[i]) else float(self.length[i])
+            if is_leaf[i]:
+                node.taxon = taxon_namespace.get_taxon(self.label[i])
+            elif self.label[i]:
+                node.label = self.label[i]
+        return tree
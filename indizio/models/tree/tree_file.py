@@ -1,10 +1,11 @@
 from pathlib import Path
 
-import dendropy
 from pydantic import BaseModel
 
+from indizio.models.tree.tree_array import TreeArray
 from indizio.models.upload.upload_file import UploadFormItem
-from indizio.util.files import to_pickle, from_pickle
+from indizio.util.cache import cache_by
+from indizio.util.files import MODEL_CACHE
 
 
 class TreeFile(BaseModel):
@@ -18,19 +19,20 @@ class TreeFile(BaseModel):
     n_leaves: int
 
     @classmethod
+    @cache_by('data')
     def from_upload_data(cls, data: UploadFormItem):
         """
-        Convert the tree into a pickle.
+        Parse the Newick file and save the tree as arrays.
         """
-        tree = dendropy.Tree.get_from_path(data.path.as_posix(), schema='newick', preserve_underscores=True)
-        path, md5 = to_pickle(tree)
+        tree = TreeArray.from_newick(data.path)
+        path, md5 = tree.save()
         return cls(
             file_name=data.file_name,
             file_id=data.name,
             path=path,
             hash=md5,
-            n_leaves=len(tree.taxon_namespace)
+            n_leaves=tree.n_leaves
         )
 
-    def read(self) -> dendropy.Tree:
-        return from_pickle(self.path)
+    def read(self) -> TreeArray:
+        return MODEL_CACHE.get(self.hash, self.path, lambda: TreeArray.load(self.path))
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+
+from dash import dcc
+
+from indizio.store.session import SessionStoreModel, SessionStoreRef
+
+
+class NetworkElementsStoreModel(SessionStoreModel):
+    """
+    This is the model for the elements that were last rendered in the network
+    graph (keyed by the element id). It is kept on the server so that only
+    the difference between two renders needs to be sent to the browser.
+    """
+
+    elements: Dict[str, dict] = dict()
+    layout: Optional[str] = None
+
+    def get_delta(self, elements: List[dict]) -> dict:
+        """
+        Compare the elements to those previously rendered. Returns the ids
+        of elements to remove, the elements to add, and the data fields that
+        have changed for each existing element (None if the field was removed).
+        """
+        new_elements = {x['data']['id']: x['data'] for x in elements}
+
+        remove = [x for x in self.elements if x not in new_elements]
+        add = list()
+        update = dict()
+        for element_id, data in new_elements.items():
+            prev_data = self.elements.get(element_id)
+            if prev_data is None:
+                add.append({'data': data})
+            elif prev_data != data:
+                changed = {k: v for k, v in data.items() if prev_data.get(k) != v}
+                changed.update({k: None for k in prev_data if k not in data})
+                update[element_id] = changed
+
+        return dict(remove=remove, add=add, update=update)
+
+    def set_elements(self, elements: List[dict], layout: str):
+        self.elements = {x['data']['id']: x['data'] for x in elements}
+        self.layout = layout
+
+    def get_node_ids(self) -> List[str]:
+        """
+        Returns the nodes that are displayed (excluding collapsed groups of nodes).
+        """
+        return [k for k, v in self.elements.items() if 'source' not in v and 'n_nodes' not in v]
+
+    def get_edges(self) -> List[dict]:
+        return [{'data': v} for v in self.elements.values() if 'source' in v]
+
+
+class NetworkElementsStore(dcc.Store):
+    """
+    This class is used to represent the store for the rendered network elements.
+    This is kept in memory (not persisted) as it mirrors the cytoscape component,
+    which is empty when the page is loaded.
+    """
+    ID = 'network-elements-store'
+
+    def __init__(self):
+        super().__init__(
+            id=self.ID,
+            storage_type='memory',
+            data=SessionStoreRef().model_dump(mode='json')
+        )
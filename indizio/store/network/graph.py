@@ -1,19 +1,20 @@
-from collections import defaultdict
 from pathlib import Path
-from typing import List, Collection
+from typing import List, Collection, Optional, Dict
 
 import networkx as nx
 from dash import dcc
 from pydantic import BaseModel
 
-from indizio.config import PERSISTENCE_TYPE, TMP_DIR
-from indizio.models.common.boolean import BooleanAllAny, BooleanShowHide
-from indizio.models.common.bound import Bound
+from indizio.config import PERSISTENCE_TYPE, NETWORK_LOD_MAX_NODES, NETWORK_LOD_MAX_EDGES
 from indizio.models.distance_matrix.dm_file import DistanceMatrixFile
+from indizio.models.network.layout import compute_node_positions
+from indizio.models.network.level_of_detail import partition_graph, collapse_graph
+from indizio.models.network.edge_table import EdgeTable
 from indizio.store.network.parameters import NetworkFormStoreModel
-from indizio.util.dataframe import dataframe_to_pairs
-from indizio.util.files import to_pickle, from_pickle
+from indizio.util.cache import cache_by, GRAPH_CACHE, get_disk_cache_stats
+from indizio.util.files import MODEL_CACHE
 from indizio.util.hashing import calc_md5
+from indizio.util.log import log_debug
 
 
 class DistanceMatrixGraphStoreModel(BaseModel):
@@ -23,116 +24,56 @@ class DistanceMatrixGraphStoreModel(BaseModel):
     path: Path
     matrices: List[DistanceMatrixFile]
     hash: str
+    min_value: Optional[float] = None
+    top_k: Optional[int] = None
 
     @classmethod
-    def from_distance_matricies(cls, matrices: Collection[DistanceMatrixFile]):
+    @cache_by('matrices', 'min_value', 'top_k')
+    def from_distance_matricies(
+            cls,
+            matrices: Collection[DistanceMatrixFile],
+            min_value: Optional[float] = None,
+            top_k: Optional[int] = None
+    ):
         """
         Create a graph from a collection of distance matrices.
+        Optionally, only edges with a value of at least min_value, or the top_k
+        edges for each node are kept.
         """
 
-        # Process each distance matrix file and add the data to the graph
-        all_nodes = set()
-        all_edges = defaultdict(lambda: defaultdict(dict))
-        for dm in matrices:
+        # Extract the pairwise values from the upper triangle of each matrix
+        edge_table = EdgeTable.from_distance_matrices(matrices, min_value=min_value, top_k=top_k)
 
-            # Read the distance matrix
-            df = dm.read()
-
-            # Update the nodes seen
-            all_nodes.update(set(df.index))
-
-            # Extract the pairwise values from the upper triangle
-            df_edge_pairs = dataframe_to_pairs(df)
-            for key, value in df_edge_pairs.items():
-                # Sort the keys to ensure that a/b is always used instead of b/a
-                key_a, key_b = sorted(key)
-                all_edges[key_a][key_b][dm.file_id] = value
-
-        # Construct the graph
-        G = nx.Graph()
-        G.add_nodes_from(sorted(all_nodes))
-        for key_a, edge_dict in all_edges.items():
-            for key_b, edge_attr_dict in edge_dict.items():
-                G.add_edge(key_a, key_b, **edge_attr_dict)
-
-        # Write the graph to disk
-        path, md5 = to_pickle(G)
+        # Write the edge table to disk
+        path, md5 = edge_table.save()
 
         # Return the object
-        return cls(path=path, matrices=matrices, hash=md5)
+        return cls(path=path, matrices=matrices, hash=md5, min_value=min_value, top_k=top_k)
 
-    def read(self) -> nx.Graph:
-        return from_pickle(self.path)
+    def read(self) -> EdgeTable:
+        return MODEL_CACHE.get(self.hash, self.path, lambda: EdgeTable.load(self.path))
 
-    def filter(self, params: NetworkFormStoreModel):
+    def filter(self, params: NetworkFormStoreModel) -> nx.Graph:
 
         # Generate a unique key for the parameters
         param_cache_key = params.get_cache_key()
         combined_cache_key = calc_md5(self.hash.encode() + param_cache_key)
         cache_key = f'cyto-graph-{combined_cache_key}'
-        cache_path = TMP_DIR / cache_key
 
         # Check if this is already present in the cache, if it is then load it
-        if cache_path.exists():
-            return from_pickle(cache_path)
+        existing_graph = GRAPH_CACHE.get(cache_key)
+        if existing_graph is not None:
+            return existing_graph
 
         # No existing data were found, compute it
-        G = self.read()
-
-        # Extract all edges for procesing
-        # Filter the nodes if specified
-        nodes_to_keep = params.node_of_interest if params.node_of_interest else list(G.nodes)
-        edges_to_process = G.edges(nodes_to_keep, data=True)
-
-        # Iterate over each edge and filter them based on the thresholding
-        edges_to_keep = list()
-        for idx, (edge_from, edge_to, d_edge_data) in enumerate(edges_to_process):
-
-            # Skip edges from self if applicable
-            if params.show_edges_to_self is BooleanShowHide.HIDE:
-                if edge_from == edge_to:
-                    continue
-
-            # Process each metric used to construct the edge to check bounds
-            edge_matches = list()
-            for file_id, corr in d_edge_data.items():
-                cur_threshold = params.thresholds[file_id]
-
-                meets_lower = False
-                if cur_threshold.left_bound is Bound.INCLUSIVE:
-                    meets_lower = corr >= cur_threshold.left_value
-                elif cur_threshold.left_bound is Bound.EXCLUSIVE:
-                    meets_lower = corr > cur_threshold.left_value
-
-                meets_upper = False
-                if cur_threshold.right_bound is Bound.INCLUSIVE:
-                    meets_upper = corr <= cur_threshold.right_value
-                elif cur_threshold.right_bound is Bound.EXCLUSIVE:
-                    meets_upper = corr < cur_threshold.right_value
-
-                edge_matches.append(meets_lower and meets_upper)
-
-            # Depending on the filtering type, check if we should keep the edge
-            if params.thresh_matching is BooleanAllAny.ALL:
-                if all(edge_matches):
-                    edges_to_keep.append((edge_from, edge_to))
-            elif params.thresh_matching is BooleanAllAny.ANY:
-                if any(edge_matches):
-                    edges_to_keep.append((edge_from, edge_to))
-
-        # Create a subgraph based on those edges that meet the filtering
-        edge_subgraph = G.edge_subgraph(edges_to_keep)
-
-        # Filter the nodes based on the degree
-        nodes_to_keep = set()
-        for cur_node, cur_degree in edge_subgraph.degree():
-            if params.degree.min_value <= cur_degree <= params.degree.max_value:
-                # Add the node and its neighbors to the list of nodes to keep
-                nodes_to_keep.add(cur_node)
-                nodes_to_keep.update(set(edge_subgraph.neighbors(cur_node)))
-
-        # Create the subgraph containing only those nodes that meet the criteria
-        composed = edge_subgraph.subgraph(nodes_to_keep)
+        edge_table = self.read()
+
+        # Evaluate the thresholding against all edges at once, then keep the
+        # nodes within the degree range (and their neighbours). Only those edges
+        # between the nodes that are kept are used to create a graph
+        mask = edge_table.filter_mask(params)
+        mask = edge_table.degree_filter_mask(mask, params.degree.min_value, params.degree.max_value)
+        composed = edge_table.to_networkx(mask)
 
         # If the user selected any nodes of interest, make sure they are included
         # in the final graph just as a node. If they aren't included by this point
@@ -141,20 +82,77 @@ class DistanceMatrixGraphStoreModel(BaseModel):
         for cur_node_of_interest in params.node_of_interest:
             if not composed.has_node(cur_node_of_interest):
                 nodes_of_interest_missing.add(cur_node_of_interest)
-        # If any were found, unfreeze the graph and add them
-        if len(nodes_of_interest_missing) > 0:
-            composed = nx.Graph(composed)
-            composed.add_nodes_from(nodes_of_interest_missing)
-        composed = nx.Graph(composed)
+        composed.add_nodes_from(nodes_of_interest_missing)
 
-        # Store the result in the cache
-        to_pickle(composed, cache_path)
+        # Store the result in the cache (evicting the least recently used)
+        GRAPH_CACHE.set(cache_key, composed)
+        log_debug(f'Graph cache: {get_disk_cache_stats(GRAPH_CACHE)}')
 
         # Return the filtered graph
         return composed
 
-    def filter_to_cytoscape(self, params: NetworkFormStoreModel):
+    def filter_level_of_detail(
+            self,
+            params: NetworkFormStoreModel,
+            max_nodes: int = NETWORK_LOD_MAX_NODES,
+            max_edges: int = NETWORK_LOD_MAX_EDGES
+    ) -> nx.Graph:
+        """
+        Returns the filtered graph, unless it has more than max_nodes nodes.
+        In which case, communities are collapsed into a single node (unless
+        they have been expanded) so that at most max_nodes are displayed, with
+        at most max_edges edges between them.
+        """
         filtered_graph = self.filter(params)
+        if filtered_graph.number_of_nodes() <= max_nodes:
+            return filtered_graph
+
+        # Partition the graph, half of the nodes are reserved for expanded groups
+        combined_cache_key = calc_md5(self.hash.encode() + params.get_cache_key() + str(max_nodes).encode())
+        cache_key = f'partition-{combined_cache_key}'
+        groups = GRAPH_CACHE.get(cache_key)
+        if groups is None:
+            groups = partition_graph(filtered_graph, max_groups=max_nodes // 2, max_group_size=max_nodes // 2)
+            GRAPH_CACHE.set(cache_key, groups)
+        return collapse_graph(filtered_graph, groups, list(params.groups_expanded),
+                              max_expanded_nodes=max_nodes // 2, max_edges=max_edges)
+
+    def get_layout_cache_key(self, params: NetworkFormStoreModel, level_of_detail: bool = True) -> str:
+        """
+        Returns a unique key for the node positions of the displayed graph.
+        """
+        if level_of_detail:
+            groups_key = '\t'.join(params.groups_expanded).encode()
+        else:
+            groups_key = b'\0'
+        combined_cache_key = calc_md5(
+            self.hash.encode() + params.get_cache_key() + params.layout.name.encode() + groups_key
+        )
+        return f'layout-{combined_cache_key}'
+
+    def get_node_positions(
+            self,
+            params: NetworkFormStoreModel,
+            level_of_detail: bool = True
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the position of each node in the displayed graph for a server-side
+        layout (or the filtered graph if level_of_detail is False). The positions
+        are cached, as they only change with the topology.
+        """
+        cache_key = self.get_layout_cache_key(params, level_of_detail)
+        positions = GRAPH_CACHE.get(cache_key)
+        if positions is None:
+            if level_of_detail:
+                graph = self.filter_level_of_detail(params)
+            else:
+                graph = self.filter(params)
+            positions = compute_node_positions(graph, params.layout)
+            GRAPH_CACHE.set(cache_key, positions)
+        return positions
+
+    def filter_to_cytoscape(self, params: NetworkFormStoreModel):
+        filtered_graph = self.filter_level_of_detail(params)
 
         # Convert the graph to cytoscape format
         cyto_data = nx.cytoscape_data(filtered_graph)
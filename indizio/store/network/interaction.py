@@ -1,14 +1,15 @@
 from typing import Set
 
 from dash import dcc
-from pydantic import BaseModel
 
 from indizio.config import PERSISTENCE_TYPE
+from indizio.store.session import SessionStoreModel, SessionStoreRef
 
 
-class NetworkInteractionStoreModel(BaseModel):
+class NetworkInteractionStoreModel(SessionStoreModel):
     """
     This is the actual model for the data in the network interaction store.
+    The data is kept on the server, as the sets of nodes can be large.
     """
 
     nodes_selected: Set[str] = set()
@@ -32,6 +33,7 @@ class NetworkInteractionStoreModel(BaseModel):
 class NetworkInteractionStore(dcc.Store):
     """
     This class is used to represent the store for the network interaction.
+    Only a reference to the data on the server is stored in the browser.
     """
     ID = 'network-interaction-store'
 
@@ -39,5 +41,5 @@ class NetworkInteractionStore(dcc.Store):
         super().__init__(
             id=self.ID,
             storage_type=PERSISTENCE_TYPE,
-            data=NetworkInteractionStoreModel().model_dump(mode='json')
+            data=SessionStoreRef().model_dump(mode='json')
         )
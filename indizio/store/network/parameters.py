@@ -4,10 +4,10 @@ import orjson
 from dash import dcc
 from pydantic import BaseModel
 
-from indizio.config import PERSISTENCE_TYPE
+from indizio.config import PERSISTENCE_TYPE, NETWORK_LOD_MAX_NODES
 from indizio.models.common.boolean import BooleanAllAny, BooleanShowHide
 from indizio.models.network.parameters import NetworkFormLayoutOption, NetworkParamThreshold, NetworkParamDegree, \
-    NetworkParamNodeColor, NetworkParamNodeSize, NetworkParamEdgeWeights
+    NetworkParamNodeColor, NetworkParamNodeSize, NetworkParamEdgeWeights, NetworkRenderer
 
 
 class NetworkFormStoreModel(BaseModel):
@@ -16,6 +16,7 @@ class NetworkFormStoreModel(BaseModel):
     """
 
     layout: NetworkFormLayoutOption = NetworkFormLayoutOption.circle
+    renderer: NetworkRenderer = NetworkRenderer.CYTOSCAPE
     node_of_interest: List[str] = list()
     thresholds: Dict[str, NetworkParamThreshold] = dict()
     thresh_matching: BooleanAllAny = BooleanAllAny.ANY
@@ -24,6 +25,19 @@ class NetworkFormStoreModel(BaseModel):
     node_color: Optional[NetworkParamNodeColor] = None
     node_size: Optional[NetworkParamNodeSize] = None
     edge_weights: Optional[NetworkParamEdgeWeights] = None
+    groups_expanded: Dict[str, int] = dict()
+
+    def toggle_group(self, group_id: str, n_nodes: int, max_nodes: int = NETWORK_LOD_MAX_NODES // 2):
+        """
+        Expand or collapse a group of nodes (for large graphs). The groups
+        expanded first are collapsed once more than max_nodes are expanded.
+        """
+        if group_id in self.groups_expanded:
+            del self.groups_expanded[group_id]
+            return
+        self.groups_expanded[group_id] = n_nodes
+        while sum(self.groups_expanded.values()) > max_nodes:
+            del self.groups_expanded[next(iter(self.groups_expanded))]
 
     def get_focal_node_str(self):
         """Returns the string output of the focal node."""
@@ -35,8 +49,7 @@ class NetworkFormStoreModel(BaseModel):
         Note that only the attributes that would affect the structure of the
         graph are considered.
         """
-        param_json = self.model_dump(mode='json')
-        param_json.pop('layout')
+        param_json = self.model_dump(mode='json', exclude={'layout', 'renderer', 'node_color', 'node_size', 'edge_weights', 'groups_expanded'})
         return orjson.dumps(param_json, option=orjson.OPT_SORT_KEYS)
 
 
@@ -0,0 +1,130 @@
+import uuid
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Type, TypeVar
+
+from diskcache import Cache
+from pydantic import BaseModel, PrivateAttr
+
+from indizio.config import SESSION_STORE_DIR, SESSION_STORE_MAX_BYTES
+from indizio.util.cache import get_cache_key
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class SessionStoreRef(BaseModel):
+    """
+    This is the data kept in the browser for a server-side store, the session
+    identifier is created on the first write, and the version is incremented
+    each time the content changes (so that the browser store is modified).
+    """
+    session_id: Optional[str] = None
+    version: int = 0
+
+
+class SessionStoreRecord(BaseModel):
+    """
+    The data of a server-side store, with the version and a hash of the content.
+    """
+    version: int
+    hash: str
+    data: BaseModel
+
+
+class SessionStoreConflict(Exception):
+    """
+    Raised when the data was saved by another callback since it was loaded.
+    """
+    pass
+
+
+class SessionStore:
+    """
+    This class holds the data of server-side stores, keyed by the model type
+    and the session. The data is kept on disk so that it can be shared
+    between worker processes.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.cache = Cache(
+            directory.as_posix(),
+            size_limit=max_bytes,
+            eviction_policy='least-recently-used'
+        )
+
+    def get(self, model_cls: Type[T], ref: Optional[dict]) -> Tuple[T, int]:
+        """
+        Return the latest data for this reference and its version, or the
+        default if none exists.
+        """
+        ref = SessionStoreRef(**ref) if ref else SessionStoreRef()
+        if ref.session_id is None:
+            return model_cls(), 0
+        record = self.cache.get((model_cls.__name__, ref.session_id))
+        if record is None:
+            return model_cls(), 0
+        return record.data, record.version
+
+    def set(self, obj: BaseModel, ref: Optional[dict], version: int) -> dict:
+        """
+        Store the data and return the updated reference to be kept in the browser.
+        The data must not have been saved since this version was loaded,
+        the version is only incremented if the content has changed.
+        """
+        ref = SessionStoreRef(**ref) if ref else SessionStoreRef()
+        session_id = ref.session_id or uuid.uuid4().hex
+        key = (obj.__class__.__name__, session_id)
+        content_hash = get_cache_key(obj.model_dump())
+        with self.cache.transact():
+            record = self.cache.get(key)
+            cur_version = record.version if record is not None else 0
+            if cur_version != version:
+                raise SessionStoreConflict(f'{key} was saved at version {cur_version} (expected {version}).')
+            if record is None or record.hash != content_hash:
+                cur_version += 1
+                self.cache.set(key, SessionStoreRecord(version=cur_version, hash=content_hash, data=obj))
+        return SessionStoreRef(session_id=session_id, version=cur_version).model_dump(mode='json')
+
+
+SESSION_STORE = SessionStore(SESSION_STORE_DIR, SESSION_STORE_MAX_BYTES)
+
+
+class SessionStoreModel(BaseModel):
+    """
+    Extend this class for store models that are kept on the server, the
+    browser store only contains a SessionStoreRef.
+    """
+
+    # The version of the data when it was loaded.
+    _version: int = PrivateAttr(0)
+
+    @classmethod
+    def load(cls, ref: Optional[dict]):
+        """
+        Load the data for this session from the server.
+        """
+        obj, version = SESSION_STORE.get(cls, ref)
+        obj._version = version
+        return obj
+
+    def save(self, ref: Optional[dict]) -> dict:
+        """
+        Save the data for this session on the server, returning the reference
+        that is to be set as the browser store data. Raises SessionStoreConflict
+        if the data was saved elsewhere since it was loaded.
+        """
+        return SESSION_STORE.set(self, ref, self._version)
+
+    @classmethod
+    def update(cls, ref: Optional[dict], func: Callable[['SessionStoreModel'], None], max_attempts: int = 10) -> dict:
+        """
+        Load the data, modify it with the function, and save it. This is repeated
+        with the latest data should it be saved elsewhere in the meantime.
+        """
+        for attempt in range(max_attempts):
+            obj = cls.load(ref)
+            func(obj)
+            try:
+                return obj.save(ref)
+            except SessionStoreConflict:
+                if attempt == max_attempts - 1:
+                    raise
@@ -1,87 +1,316 @@
 import functools
+import inspect
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Collection, Dict, List, Optional, TypeVar
 
-from frozendict import frozendict
+import orjson
+from diskcache import Cache
+from pydantic import BaseModel
 
+from indizio import __version__
+from indizio.config import DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES, TMP_DIR, GRAPH_CACHE_DIR, GRAPH_CACHE_MAX_BYTES, \
+    CALLBACK_CACHE_MAX_BYTES, CALLBACK_CACHE_DIR, SESSION_STORE_DIR
+from indizio.util.files import get_size_on_disk
+from indizio.util.hashing import calc_md5
+from indizio.util.log import log_debug
 
-def to_hashable(obj):
+T = TypeVar('T')
+
+
+def json_default(obj):
+    """
+    Convert the objects that orjson cannot serialize natively (e.g. pydantic
+    models, paths, and sets) into a value that it can.
     """
-    Serializes a nested dictionary to a frozendict for memoization.
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    if isinstance(obj, Path):
+        return obj.as_posix()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    raise TypeError(f'Unable to serialize object of type: {type(obj)}')
+
+
+def get_cache_key(obj) -> str:
+    """
+    Returns a fixed-size digest of the canonical JSON serialization (i.e. with
+    the keys sorted) of an object, this is used as a cache key.
+    """
+    return calc_md5(orjson.dumps(
+        obj,
+        default=json_default,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ))
+
+
+def get_artifact_paths(obj) -> List[Path]:
     """
+    Returns all paths that are referenced by an object (e.g. the files of a model).
+    """
+    if isinstance(obj, Path):
+        return [obj]
+    if isinstance(obj, BaseModel):
+        return [p for k in obj.model_fields for p in get_artifact_paths(getattr(obj, k))]
     if isinstance(obj, dict):
-        return frozendict((k, to_hashable(v)) for k, v in obj.items())
-    if isinstance(obj, list) or isinstance(obj, tuple):
-        return tuple(to_hashable(x) for x in obj)
-    return obj
-
-
-def from_hashable(obj):
-    """
-    De-serializes a frozendict to a dictionary.
-    """
-    if isinstance(obj, frozendict):
-        return {k: from_hashable(v) for k, v in obj.items()}
-    if isinstance(obj, tuple):
-        return [from_hashable(x) for x in obj]
-    return obj
-
-
-def freezeargs(func):
-    """
-    Wrapper to transform a function's arguments to a hashable type.
-    """
-
-    @functools.wraps(func)
-    def wrapped(*args, **kwargs):
-        args_frozen = to_hashable(args)
-        kwargs_frozen = to_hashable(kwargs)
-        return func(*args_frozen, **kwargs_frozen)
-
-    return wrapped
-
-#
-# def get_tmp_dir() -> Path:
-#     """
-#     Returns a temporary path for storing files.
-#     This is set to be prefixed by the parent PID.
-#     """
-#     parent_pid = os.getppid()
-#     tmp_root = tempfile.gettempdir()
-#     return Path(tmp_root) / f'indizio-{parent_pid}'
-
-# def cache_by(kwargs_to_cache):
-#     """
-#     This wrapper will use the diskcache to memoize the function's results
-#     based on the keys given.
-#     """
-#     # If a string is provided, convert it into a list for consistency
-#     if isinstance(kwargs_to_cache, str):
-#         kwargs_to_cache = [kwargs_to_cache]
-#
-#     def actual_decorator(func):
-#         @functools.wraps(func)
-#         def wrapper(*args, **kwargs):
-#
-#             # Generate the cache key
-#             cache_key = {
-#                 'func': repr(func),
-#             }
-#             for key in kwargs_to_cache:
-#                 cache_key[key] = kwargs[key]
-#             cache_key = orjson.dumps(cache_key, option=orjson.OPT_SORT_KEYS)
-#             cache_key = calc_md5(cache_key)
-#
-#             # Check the cache to see if the result already exists
-#             with Cache(CACHE.directory) as cache:
-#                 existing_result = cache.get(cache_key)
-#                 if existing_result:
-#                     return existing_result
-#
-#             # Otherwise, run the function and save the result
-#             result = func(*args, **kwargs)
-#             with Cache(CACHE.directory) as cache:
-#                 cache.set(cache_key, result)
-#             return result
-#
-#         return wrapper
-#
-#     return actual_decorator
+        return [p for v in obj.values() for p in get_artifact_paths(v)]
+    if isinstance(obj, (list, tuple)):
+        return [p for v in obj for p in get_artifact_paths(v)]
+    return list()
+
+
+# The persistent cache of results computed from uploaded files.
+DISK_CACHE = Cache(
+    DISK_CACHE_DIR.as_posix(),
+    size_limit=DISK_CACHE_MAX_BYTES,
+    eviction_policy='least-recently-used',
+    statistics=True
+)
+
+# The cache of filtered network graphs (the access time of each item is recorded).
+GRAPH_CACHE = Cache(
+    GRAPH_CACHE_DIR.as_posix(),
+    size_limit=GRAPH_CACHE_MAX_BYTES,
+    eviction_policy='least-recently-used',
+    statistics=True
+)
+
+
+def get_disk_cache_stats(cache: Cache) -> Dict[str, float]:
+    """
+    Returns the number of items, size (bytes), and hit rate of a disk cache.
+    """
+    hits, misses = cache.stats()
+    return {
+        'items': len(cache),
+        'bytes': cache.volume(),
+        'max_bytes': cache.size_limit,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses > 0 else 0.0,
+    }
+
+
+def cache_by(*arg_names: str):
+    """
+    This wrapper will use the diskcache to memoize the function's results
+    based on the arguments given (e.g. the models containing the input hashes).
+    As the results persist between sessions, a cached result is only used if
+    all of the paths that it references still exist.
+    """
+
+    def actual_decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            # Generate the cache key
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            cache_key = {
+                'func': f'{func.__module__}.{func.__qualname__}',
+                'version': __version__,
+            }
+            for key in arg_names:
+                cache_key[key] = arguments.arguments[key]
+            cache_key = get_cache_key(cache_key)
+
+            # Check the cache to see if the result already exists
+            existing_result = DISK_CACHE.get(cache_key)
+            if existing_result is not None:
+                paths = get_artifact_paths(existing_result)
+                if all(p.exists() for p in paths):
+                    log_debug(f'Loaded {func.__qualname__} from the cache: {cache_key}')
+                    touch_paths(paths)
+                    return existing_result
+
+            # Otherwise, run the function and save the result
+            result = func(*args, **kwargs)
+            DISK_CACHE.set(cache_key, result)
+            return result
+
+        return wrapper
+
+    return actual_decorator
+
+
+def touch_paths(paths: Collection[Path]):
+    """
+    Update the modification time of each path, this is used to record when
+    an artifact was last used.
+    """
+    for path in paths:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def trim_tmp_dir(max_bytes: int):
+    """
+    Remove the least recently used files from the temporary directory until the
+    total size is below the maximum (the disk caches are excluded).
+    """
+    entries = list()
+    for path in TMP_DIR.iterdir():
+        if path in {DISK_CACHE_DIR, GRAPH_CACHE_DIR, CALLBACK_CACHE_DIR, SESSION_STORE_DIR}:
+            continue
+        try:
+            entries.append((path.stat().st_mtime, get_size_on_disk(path), path))
+        except OSError:
+            continue
+
+    total_bytes = sum(x[1] for x in entries)
+    for _, n_bytes, path in sorted(entries, key=lambda x: x[0]):
+        if total_bytes <= max_bytes:
+            break
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+        total_bytes -= n_bytes
+    return total_bytes
+
+
+def clean_graph_cache(max_bytes: int):
+    """
+    Set the maximum size of the filtered graph cache and evict items until it
+    is below the limit, the hit rate is reset for this session. Any filtered
+    graphs from older versions are removed.
+    """
+    for path in TMP_DIR.glob('cyto-graph-*'):
+        path.unlink(missing_ok=True)
+    GRAPH_CACHE.reset('size_limit', max_bytes)
+    GRAPH_CACHE.cull()
+    GRAPH_CACHE.stats(enable=True, reset=True)
+
+
+class CallbackCache:
+    """
+    A size-bounded, least-recently-used memoization of callback results.
+
+    Results are stored pickled, so that their size is known and a cached result
+    cannot be modified by the caller. Optionally, results can be shared between
+    worker processes by enabling a disk cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared: Optional[Cache] = None
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, fn: Callable[[], T]) -> T:
+        """
+        Return the cached result for this key, otherwise compute it using
+        the function provided and store it in the cache.
+        """
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(data)
+
+        # Check if another process has computed this result
+        if self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._add(key, data)
+                return pickle.loads(data)
+
+        # Compute the result outside of the lock to allow concurrent calls
+        with self._lock:
+            self.misses += 1
+        result = fn()
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._add(key, data)
+        if self.shared is not None:
+            self.shared.set(key, data)
+        return result
+
+    def enable_sharing(self, directory: Path):
+        """
+        Share results between processes using a disk cache in this directory.
+        """
+        self.shared = Cache(directory.as_posix(), size_limit=self.max_bytes, eviction_policy='least-recently-used')
+
+    def set_max_bytes(self, max_bytes: int):
+        """
+        Change the byte budget of the cache, evicting items if required.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+        if self.shared is not None:
+            self.shared.reset('size_limit', max_bytes)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size of the cache and the hit/miss counters.
+        """
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self.n_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _add(self, key: str, data: bytes):
+        """
+        Store the result, results larger than the budget are never cached.
+        """
+        if key in self._items or len(data) > self.max_bytes:
+            return
+        self._items[key] = data
+        self.n_bytes += len(data)
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used items until the cache is within budget.
+        """
+        while self.n_bytes > self.max_bytes and len(self._items) > 0:
+            _, data = self._items.popitem(last=False)
+            self.n_bytes -= len(data)
+
+
+CALLBACK_CACHE = CallbackCache(CALLBACK_CACHE_MAX_BYTES)
+
+
+def memoize_callback(ignore_prefix: str = 'ts_'):
+    """
+    Memoize the results of a Dash callback, keyed on the function and the
+    arguments that determine the output (i.e. the store data). Arguments
+    starting with the prefix (e.g. modified timestamps) are not part of the key.
+    """
+
+    def actual_decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            cache_key = get_cache_key({
+                'func': f'{func.__module__}.{func.__qualname__}',
+                **{k: v for k, v in arguments.arguments.items() if not k.startswith(ignore_prefix)}
+            })
+            return CALLBACK_CACHE.get(cache_key, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return actual_decorator
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import numpy as np
+
+from indizio.util.log import log_debug, pretty_fmt_seconds
+from indizio.util.types import ProgressFn
+
+
+def pearson_corr(
+        values: np.ndarray,
+        out: np.ndarray,
+        block_size: int = 1024,
+        n_workers: Optional[int] = None,
+        progress: Optional[ProgressFn] = None
+) -> np.ndarray:
+    """
+    Compute the Pearson correlation between the columns of a matrix (without
+    missing values) into the output array provided (e.g. a memory-map).
+
+    The columns are standardized once, then each tile of the upper triangle
+    is computed by matrix multiplication in a thread pool (BLAS releases the GIL).
+    Columns with a constant value have a correlation of NaN (as in pandas).
+    """
+    n_cols = values.shape[1]
+
+    # Center and scale each column to unit length, so that the dot product is the correlation
+    x = values.astype(np.float64)
+    x -= x.mean(axis=0)
+    norm = np.sqrt(np.einsum('ij,ij->j', x, x))
+    is_constant = norm == 0
+    norm[is_constant] = 1
+    x /= norm
+
+    def compute_tile(i: int, j: int, n: int) -> np.ndarray:
+        tile = np.clip(x[:, i:i + n].T @ x[:, j:j + n], -1, 1)
+        tile[is_constant[i:i + n], :] = np.nan
+        tile[:, is_constant[j:j + n]] = np.nan
+        return tile
+
+    compute_tiles(n_cols, compute_tile, out, block_size, n_workers, progress)
+    return out
+
+
+def compute_tiles(
+        n_cols: int,
+        compute_tile: Callable[[int, int, int], np.ndarray],
+        out: np.ndarray,
+        block_size: int = 1024,
+        n_workers: Optional[int] = None,
+        progress: Optional[ProgressFn] = None
+) -> np.ndarray:
+    """
+    Fill a symmetric (n_cols x n_cols) output array by computing each tile of
+    the upper triangle in a thread pool. The function is called with the
+    start of the rows (i), columns (j), and the block size.
+    """
+    start_time = time.time()
+
+    # Split the upper triangle into tiles
+    starts = range(0, n_cols, block_size)
+    tiles = [(i, j) for i in starts for j in starts if j >= i]
+
+    def fill_tile(i: int, j: int):
+        tile = compute_tile(i, j, block_size)
+        out[i:i + block_size, j:j + block_size] = tile
+        out[j:j + block_size, i:i + block_size] = tile.T
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(fill_tile, i, j) for i, j in tiles]
+        for n_done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            if progress:
+                progress(n_done / len(tiles))
+
+    duration = max(time.time() - start_time, 1e-9)
+    log_debug(f'Computed {len(tiles):,} tiles in {pretty_fmt_seconds(duration)} '
+              f'({len(tiles) / duration:,.1f} tiles/s, {n_cols * n_cols / duration:,.0f} cells/s).')
+    return out
+
+
+def cooccurrence_metric(
+        values: np.ndarray,
+        metric_fn: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+        out: np.ndarray,
+        block_size: int = 1024,
+        n_workers: Optional[int] = None,
+        progress: Optional[ProgressFn] = None
+) -> np.ndarray:
+    """
+    Compute a metric between each pair of columns from the 2x2 contingency
+    table of their presence (value > 0), missing values are absent.
+    The metric function is called with the counts (n11, n10, n01, n00).
+    """
+    n_rows, n_cols = values.shape
+
+    # The counts are exact in float32 as each partial sum is an integer < 2^24
+    x = (values > 0).astype(np.float32 if n_rows < 2 ** 24 else np.float64)
+    col_sums = x.sum(axis=0, dtype=np.float64)
+
+    def compute_tile(i: int, j: int, n: int) -> np.ndarray:
+        n11 = (x[:, i:i + n].T @ x[:, j:j + n]).astype(np.float64)
+        n10 = col_sums[i:i + n, None] - n11
+        n01 = col_sums[None, j:j + n] - n11
+        n00 = n_rows - n11 - n10 - n01
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return metric_fn(n11, n10, n01, n00)
+
+    return compute_tiles(n_cols, compute_tile, out, block_size, n_workers, progress)
+
+
+def phi_coefficient(n11: np.ndarray, n10: np.ndarray, n01: np.ndarray, n00: np.ndarray) -> np.ndarray:
+    """
+    The Pearson correlation between two binary variables (the phi coefficient).
+    Columns with a constant value have a correlation of NaN (as in pandas).
+    """
+    numerator = n11 * n00 - n10 * n01
+    denominator = np.sqrt((n11 + n10) * (n01 + n00) * (n11 + n01) * (n10 + n00))
+    return np.clip(numerator / denominator, -1, 1)
+
+
+def jaccard_index(n11: np.ndarray, n10: np.ndarray, n01: np.ndarray, n00: np.ndarray) -> np.ndarray:
+    """
+    The fraction of rows where both are present, out of those where either is present.
+    """
+    return n11 / (n11 + n10 + n01)
+
+
+def mutual_information(n11: np.ndarray, n10: np.ndarray, n01: np.ndarray, n00: np.ndarray) -> np.ndarray:
+    """
+    The mutual information (bits) between two binary variables.
+    """
+    n = n11 + n10 + n01 + n00
+    n_x1, n_x0 = n11 + n10, n01 + n00
+    n_y1, n_y0 = n11 + n01, n10 + n00
+    out = np.zeros(n11.shape, dtype=np.float64)
+    for n_xy, n_x, n_y in ((n11, n_x1, n_y1), (n10, n_x1, n_y0), (n01, n_x0, n_y1), (n00, n_x0, n_y0)):
+        out += np.where(n_xy > 0, n_xy / n * np.log2(n_xy * n / (n_x * n_y)), 0)
+    return np.clip(out, 0, 1)
+
+
+def abs_log_odds_ratio(n11: np.ndarray, n10: np.ndarray, n01: np.ndarray, n00: np.ndarray) -> np.ndarray:
+    """
+    The absolute log odds ratio of co-occurrence, 0.5 is added to each count
+    (Haldane-Anscombe correction) so that it is defined when a count is zero.
+    """
+    return np.abs(np.log((n11 + 0.5) * (n00 + 0.5) / ((n10 + 0.5) * (n01 + 0.5))))
@@ -1,13 +1,20 @@
 import csv
 import io
 import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Collection, Dict, Optional, Tuple, TypeVar
 
+import numpy as np
 import pandas as pd
 
-from indizio.config import TMP_DIR
-from indizio.util.hashing import calc_md5
+from indizio.config import TMP_DIR, MODEL_CACHE_MAX_BYTES
+from indizio.util.hashing import calc_md5, calc_md5_arrays
+
+T = TypeVar('T')
 
 
 def to_pickle_df(df: pd.DataFrame) -> Tuple[Path, str]:
@@ -70,6 +77,130 @@ def from_pickle(path: Path):
         return pickle.load(f)
 
 
+def to_npy_dir(arrays: Dict[str, np.ndarray]) -> Tuple[Path, str]:
+    """
+    Save a collection of named arrays as .npy files within a directory.
+    Returns the temp path to the directory (by default, this is the md5).
+    """
+    md5 = calc_md5_arrays(arrays)
+    path = TMP_DIR / md5
+    if path.exists():
+        return path, md5
+
+    # Write to a staging directory first to prevent partial reads
+    tmp_path = Path(tempfile.mkdtemp(dir=TMP_DIR))
+    for name, array in arrays.items():
+        np.save(tmp_path / f'{name}.npy', array, allow_pickle=False)
+    try:
+        tmp_path.rename(path)
+    except OSError:
+        # Another process has already written the same content
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path, md5
+
+
+def from_npy_dir(path: Path, mmap_mode: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Load a collection of named arrays from a directory of .npy files.
+    """
+    return {
+        p.stem: np.load(p, mmap_mode=mmap_mode, allow_pickle=False)
+        for p in sorted(path.glob('*.npy'))
+    }
+
+
+def to_packed_df(df: pd.DataFrame) -> Tuple[Path, str]:
+    """
+    Save a binary (0/1) dataframe as a directory of .npy files, where the values
+    are bit-packed along each row, and the index and column labels are stored separately.
+    Returns the temp path to the directory (by default, this is the md5).
+    """
+    return to_npy_dir({
+        'packed': np.packbits(df.to_numpy(dtype=np.uint8), axis=1),
+        'index': to_label_array(df.index),
+        'columns': to_label_array(df.columns),
+    })
+
+
+def from_packed_df(
+        path: Path,
+        rows: Optional[Collection] = None,
+        cols: Optional[Collection] = None
+) -> pd.DataFrame:
+    """
+    Read a dataframe that was saved using to_packed_df. Only the bytes that
+    contain the requested rows and columns are unpacked (all if None).
+    The subset will retain the order of the rows and columns on disk.
+    """
+    packed = np.load(path / 'packed.npy', mmap_mode='r')
+    index = np.load(path / 'index.npy')
+    columns = np.load(path / 'columns.npy')
+
+    if rows is not None:
+        idx_rows = np.flatnonzero(np.isin(index, list(rows)))
+        packed = packed[idx_rows]
+        index = index[idx_rows]
+
+    if cols is None:
+        values = np.unpackbits(packed, axis=1, count=len(columns))
+    else:
+        # Extract the bit for each column from the byte that contains it
+        idx_cols = np.flatnonzero(np.isin(columns, list(cols)))
+        values = (packed[:, idx_cols // 8] >> (7 - idx_cols % 8).astype(np.uint8)) & 1
+        columns = columns[idx_cols]
+
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def to_label_array(labels) -> np.ndarray:
+    """
+    Convert a collection of labels (e.g. a DataFrame index) into an array
+    that can be saved without pickling.
+    """
+    out = np.asarray(list(labels))
+    if out.dtype == object:
+        out = out.astype(str)
+    return out
+
+
+def to_npy_df(df: pd.DataFrame) -> Tuple[Path, str]:
+    """
+    Save a numeric dataframe as a directory of .npy files, where the values,
+    index, and column labels are stored separately.
+    Returns the temp path to the directory (by default, this is the md5).
+    """
+    return to_npy_dir({
+        'values': np.ascontiguousarray(df.to_numpy()),
+        'index': to_label_array(df.index),
+        'columns': to_label_array(df.columns),
+    })
+
+
+def from_npy_df(
+        path: Path,
+        rows: Optional[Collection] = None,
+        cols: Optional[Collection] = None
+) -> pd.DataFrame:
+    """
+    Read a dataframe that was saved using to_npy_df. The values are memory-mapped
+    and are not copied unless a subset of rows and/or columns are requested.
+    The subset will retain the order of the rows and columns on disk.
+    """
+    values = np.load(path / 'values.npy', mmap_mode='r')
+    index = np.load(path / 'index.npy')
+    columns = np.load(path / 'columns.npy')
+
+    # Only read the values for the rows and columns that are required
+    if rows is not None or cols is not None:
+        idx_rows = np.flatnonzero(np.isin(index, list(rows))) if rows is not None else np.arange(len(index))
+        idx_cols = np.flatnonzero(np.isin(columns, list(cols))) if cols is not None else np.arange(len(columns))
+        values = values[np.ix_(idx_rows, idx_cols)]
+        index = index[idx_rows]
+        columns = columns[idx_cols]
+
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
 def to_file(data: bytes, name: Optional[str] = None) -> Path:
     """
     Saves the bytes object to disk and returns the path.
@@ -93,3 +224,203 @@ def get_delimiter(file_path: Path, n_lines=5):
             lines.append(f.readline())
     sample = '\n'.join(lines)
     return sniffer.sniff(sample).delimiter
+
+
+def count_lines(path: Path, buffer_size: int = 1024 * 1024) -> int:
+    """
+    Count the number of lines in a file without decoding it.
+    """
+    n_lines = 0
+    last_byte = b'\n'
+    with path.open('rb') as f:
+        while True:
+            buffer = f.read(buffer_size)
+            if not buffer:
+                break
+            n_lines += buffer.count(b'\n')
+            last_byte = buffer[-1:]
+    # Include the last line if it is not terminated by a newline
+    if last_byte != b'\n':
+        n_lines += 1
+    return n_lines
+
+
+def read_numeric_table(
+        path: Path,
+        delimiter: str,
+        dtype=np.float32,
+        detect_binary: bool = False,
+        chunk_cells: int = 2 ** 22
+) -> pd.DataFrame:
+    """
+    Read a numeric table (where the first column is the index) in chunks
+    directly into a preallocated array. Only the index is read as strings.
+
+    If detect_binary is set, values are stored as uint8 until a value that
+    is not 0 or 1 (including missing values) is found, then as dtype.
+
+    A ValueError is raised identifying the first non-numeric cell found.
+    """
+    # Read the header to determine the number of columns
+    columns = pd.read_table(path, sep=delimiter, nrows=0, dtype=str).columns
+    index_name, columns = columns[0], columns[1:]
+
+    # Allocate the output array, this is an upper bound as blank lines are skipped
+    n_rows_max = max(count_lines(path) - 1, 0)
+    values = np.empty((n_rows_max, len(columns)), dtype=np.uint8 if detect_binary else dtype)
+    index = list()
+
+    # Read the file in chunks of approximately the same number of cells
+    reader = pd.read_table(
+        path,
+        sep=delimiter,
+        index_col=0,
+        dtype={index_name: str},
+        chunksize=max(chunk_cells // max(len(columns), 1), 1)
+    )
+    n_rows = 0
+    for chunk in reader:
+        raise_on_non_numeric(chunk, first_row=n_rows)
+        chunk_values = chunk.to_numpy(dtype=dtype)
+
+        # Switch to the non-binary type as soon as a non-binary value is found
+        if values.dtype == np.uint8 and not np.all((chunk_values == 0) | (chunk_values == 1)):
+            values = values.astype(dtype)
+
+        # Increase the size of the array if the line count was an underestimate
+        if n_rows + len(chunk) > len(values):
+            values = np.resize(values, (max(n_rows + len(chunk), 2 * len(values)), len(columns)))
+
+        values[n_rows:n_rows + len(chunk)] = chunk_values
+        index.extend(chunk.index)
+        n_rows += len(chunk)
+
+    return pd.DataFrame(
+        values[:n_rows],
+        index=pd.Index(index, name=index_name),
+        columns=columns,
+        copy=False
+    )
+
+
+def raise_on_non_numeric(df: pd.DataFrame, first_row: int = 0):
+    """
+    Raise a ValueError identifying the first non-numeric cell in the dataframe.
+    Missing values are permitted. The row number is relative to the file.
+    """
+    first_error = None
+    for col_idx, (col_name, column) in enumerate(df.items()):
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            continue
+
+        # Identify values that were present but could not be converted
+        as_str = column.astype(object)
+        if pd.api.types.is_bool_dtype(column):
+            is_invalid = np.ones(len(column), dtype=bool)
+        else:
+            is_invalid = pd.to_numeric(as_str, errors='coerce').isna().to_numpy() & column.notna().to_numpy()
+        invalid_rows = np.flatnonzero(is_invalid)
+        if len(invalid_rows) > 0:
+            row_idx = int(invalid_rows[0])
+            if first_error is None or (row_idx, col_idx) < first_error[:2]:
+                first_error = (row_idx, col_idx, df.index[row_idx], col_name, as_str.iloc[row_idx])
+
+    if first_error is not None:
+        row_idx, _, row_name, col_name, value = first_error
+        raise ValueError(f'Non-numeric value "{value}" found in row {first_row + row_idx + 1} '
+                         f'("{row_name}"), column "{col_name}".')
+
+
+def get_size_on_disk(path: Path) -> int:
+    """
+    Returns the size of a file, or the total size of all files in a directory.
+    """
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+    return path.stat().st_size
+
+
+class ModelCache:
+    """
+    A process-wide, size-bounded, least-recently-used cache of deserialized
+    objects. Items are keyed by the content hash of the file they were read from.
+
+    The size of each item is approximated by its size on disk. Cached objects
+    are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[str, Tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, path: Path, load_fn: Callable[[], T], n_bytes: Optional[int] = None) -> T:
+        """
+        Return the cached object for this key, otherwise load it from the path
+        using the function provided and store it in the cache. The size of the
+        object can be provided if it differs significantly from that on disk.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+
+        # Load the object outside of the lock to allow concurrent reads
+        obj = load_fn()
+        if n_bytes is None:
+            n_bytes = get_size_on_disk(path)
+
+        # Objects larger than the budget are never cached
+        if n_bytes > self.max_bytes:
+            return obj
+
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (obj, n_bytes)
+                self.n_bytes += n_bytes
+            self._evict()
+        return obj
+
+    def set_max_bytes(self, max_bytes: int):
+        """
+        Change the byte budget of the cache, evicting items if required.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.n_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size of the cache and the hit/miss counters.
+        """
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self.n_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _evict(self):
+        """
+        Remove the least recently used items until the cache is within budget.
+        """
+        while self.n_bytes > self.max_bytes and len(self._items) > 0:
+            _, (_, n_bytes) = self._items.popitem(last=False)
+            self.n_bytes -= n_bytes
+
+
+# The global cache that is shared by all models in this process
+MODEL_CACHE = ModelCache(MODEL_CACHE_MAX_BYTES)
@@ -1,4 +1,7 @@
 import hashlib
+from typing import Dict
+
+import numpy as np
 
 
 def calc_md5(data: bytes) -> str:
@@ -6,3 +9,16 @@ def calc_md5(data: bytes) -> str:
     Calculate the MD5 checksum of the given data.
     """
     return hashlib.md5(data).hexdigest()
+
+
+def calc_md5_arrays(arrays: Dict[str, np.ndarray]) -> str:
+    """
+    Calculate the MD5 checksum of a collection of named arrays.
+    The name, data type, and shape of each array are also considered.
+    """
+    md5 = hashlib.md5()
+    for name, array in sorted(arrays.items()):
+        array = np.ascontiguousarray(array)
+        md5.update(f'{name}:{array.dtype.str}:{array.shape}'.encode())
+        md5.update(array.data)
+    return md5.hexdigest()
@@ -0,0 +1,99 @@
+import re
+from pathlib import Path
+from typing import Iterator, Tuple, List
+
+import numpy as np
+
+# The tokens of a Newick string: a quoted label, a comment, a delimiter, or an unquoted label.
+RE_NEWICK_TOKEN = re.compile(r"\s*(?:('(?:[^']|'')*'(?!'))|(\[[^\]]*\])|([(),:;])|([^\s(),:;'\[\]]+))")
+
+# The number of characters read from the file at a time.
+NEWICK_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_newick_tokens(path: Path, chunk_size: int = NEWICK_CHUNK_SIZE) -> Iterator[Tuple[str, str]]:
+    """
+    Read the Newick file in chunks, yielding each token as a (delimiter, label)
+    tuple, where only one is set. Comments are ignored, and quoted labels are
+    unquoted. Unquoted labels are returned as-is (i.e. underscores are preserved).
+    """
+    buffer = ''
+    with open(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            is_eof = len(chunk) == 0
+            buffer += chunk
+
+            pos = 0
+            while pos < len(buffer):
+                match = RE_NEWICK_TOKEN.match(buffer, pos)
+
+                # The token may continue into the next chunk (e.g. a quoted label)
+                if match is None or (match.end() == len(buffer) and not is_eof):
+                    if is_eof and buffer[pos:].strip():
+                        raise ValueError(f'Unable to parse the Newick file near: {buffer[pos:pos + 50]}')
+                    break
+                pos = match.end()
+
+                quoted, comment, delimiter, label = match.groups()
+                if quoted is not None:
+                    yield '', quoted[1:-1].replace("''", "'")
+                elif delimiter is not None:
+                    yield delimiter, ''
+                elif label is not None:
+                    yield '', label
+
+            buffer = buffer[pos:]
+            if is_eof:
+                return
+
+
+def parse_newick(path: Path) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Parse the first tree in a Newick file, the nodes are numbered in pre-order
+    (i.e. a parent is always before its children). Returns the parent of each
+    node (-1 for the root), the branch lengths (NaN if missing), and the labels.
+    """
+    parent, length, label = list(), list(), list()
+
+    def add_node(parent_idx: int) -> int:
+        parent.append(parent_idx)
+        length.append(np.nan)
+        label.append('')
+        return len(parent) - 1
+
+    # The node whose children are being read, and the last node that was read
+    cur_node, last_node = -1, -1
+    expect_node, expect_length = True, False
+    for delimiter, value in iter_newick_tokens(path):
+        if delimiter == '(':
+            cur_node = add_node(cur_node)
+            expect_node = True
+            continue
+
+        # A node without a label or children (e.g. "(,)") is an empty leaf
+        if expect_node:
+            last_node = add_node(cur_node)
+            expect_node = False
+
+        if delimiter == ',':
+            expect_node = True
+        elif delimiter == ')':
+            if cur_node < 0:
+                raise ValueError('The Newick file has an unmatched closing parenthesis.')
+            last_node, cur_node = cur_node, parent[cur_node]
+        elif delimiter == ':':
+            expect_length = True
+        elif delimiter == ';':
+            break
+        elif expect_length:
+            length[last_node] = float(value)
+            expect_length = False
+        else:
+            label[last_node] = value
+
+    if cur_node >= 0:
+        raise ValueError('The Newick file has an unmatched opening parenthesis.')
+    if len(parent) == 0:
+        raise ValueError('The Newick file does not contain a tree.')
+    return np.array(parent, dtype=np.int32), np.array(length, dtype=np.float64), label
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from indizio.util.types import ProgressFn
+
+
+class ProgressTracker:
+    """
+    Stores the progress of long-running tasks so that it can be polled
+    by another callback (e.g. from a dcc.Interval) while the task runs.
+    Only the most recent max_tasks are kept.
+    """
+
+    def __init__(self, max_tasks: int = 1000):
+        self._lock = threading.Lock()
+        self._progress: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self.max_tasks = max_tasks
+
+    def update(self, key: str, value: float, message: str = ''):
+        """
+        Set the progress (between 0 and 1) and message for a task.
+        """
+        with self._lock:
+            self._progress[key] = (min(max(float(value), 0.0), 1.0), message)
+            self._progress.move_to_end(key)
+            while len(self._progress) > self.max_tasks:
+                self._progress.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[float, str]:
+        """
+        Return the progress and message for a task.
+        """
+        with self._lock:
+            return self._progress.get(key, (0.0, ''))
+
+    def reset(self, key: str):
+        with self._lock:
+            self._progress.pop(key, None)
+
+    def get_progress_fn(self, key: str, message: str, start: float = 0.0, end: float = 1.0) -> ProgressFn:
+        """
+        Return a function that maps the progress of a sub-task (between 0 and 1)
+        into the range (start, end) of the overall task.
+        """
+
+        def progress_fn(value: float):
+            self.update(key, start + (end - start) * value, message)
+
+        return progress_fn
+
+
+PROGRESS = ProgressTracker()
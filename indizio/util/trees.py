@@ -1,20 +1,11 @@
-from collections import deque, defaultdict
-from typing import Dict
+from collections import defaultdict
+from typing import List
 
 import dendropy
 import numpy as np
 import plotly.graph_objects as go
 
-
-def get_nodes_to_depth(tree: dendropy.Tree):
-    out = defaultdict(list)
-    queue = deque([(tree.seed_node, 0)])
-    while len(queue) > 0:
-        cur_node, cur_depth = queue.pop()
-        out[cur_depth].append(cur_node)
-        for child_node in cur_node.child_node_iter():
-            queue.append((child_node, cur_depth + 1))
-    return dict(out)
+from indizio.models.tree.tree_array import TreeArray
 
 
 def get_leaf_parent_binary(tree: dendropy.Tree):
@@ -30,140 +21,114 @@ def get_leaf_parent_binary(tree: dendropy.Tree):
 
 
 def convert_dendropy_tree_to_linkage_matrix(tree: dendropy.Tree, order: list) -> np.array:
-    # https://docs.scipy.org/doc/scipy/reference/generated/scipy.cluster.hierarchy.linkage.html
-
-    # Compute the output dataset
-    last_cluster_id = (len(order) - 1) * 2
-    d_out_tmp = dict()
-
-    # Traverse down the tree and assign a cluster ID to each group
-    queue = deque([(tree.seed_node, last_cluster_id)])
-    while len(queue) > 0:
-        cur_node, cur_cluster_id = queue.popleft()
-
-        # Stop processing if we have reached the tips of the tree
-        if cur_node.is_leaf():
-            break
-
-        left_child, right_child = cur_node.child_nodes()
-
-        if left_child.is_leaf():
-            left_idx = order.index(left_child.taxon.label)
-        else:
-            left_idx = last_cluster_id - 1
-            last_cluster_id = left_idx
-            queue.append((left_child, left_idx))
-
-        if right_child.is_leaf():
-            right_idx = order.index(right_child.taxon.label)
-        else:
-            right_idx = last_cluster_id - 1
-            last_cluster_id = right_idx
-            queue.append((right_child, right_idx))
-
-        cur_dist = left_child.edge_length + right_child.edge_length
-
-        # The final item is the number of children but as far as I can
-        # tell this isn't used
-        d_out_tmp[cur_cluster_id] = (left_idx, right_idx, cur_dist, 1)
-
-    # Consider the distance between the points as the X axis in the plot.
-    # i.e. it is how high the node is from the cladograms base.
-
-    # Reformat the dictionary to an array
-    out = list()
-    for _, row in sorted(d_out_tmp.items(), key=lambda x: x[0]):
-        out.append(row)
-    out = np.array(out)
-
-    # The cluster distances need to be monotonic increasing, assign their
-    # cluster id instead
-
-    out[0, 2] = 1
-    out[1, 2] = 2
-    out[2, 2] = 3
-    out[3, 2] = 4
-    out[4, 2] = 5
-    out[5, 2] = 60
-
+    """
+    Convert the tree to a linkage matrix (in the scipy format), where the index
+    of each leaf is its position in the order.
+
+    The height of each cluster is the greatest distance from it to a leaf,
+    this is monotonic (negative edge lengths are taken as zero). Polytomies
+    are resolved by merging the children in order, at the same height.
+    https://docs.scipy.org/doc/scipy/reference/generated/scipy.cluster.hierarchy.linkage.html
+    """
+    d_label_to_idx = {label: idx for idx, label in enumerate(order)}
+    n_leaves = len(order)
+
+    # The cluster id, height, and number of leaves of each visited node
+    d_node_to_cluster = dict()
+
+    # Process the nodes in post-order, so that the children are known
+    rows = list()
+    stack = [(tree.seed_node, False)]
+    while len(stack) > 0:
+        cur_node, visited = stack.pop()
+        children = cur_node.child_nodes()
+        if not visited and len(children) > 0:
+            stack.append((cur_node, True))
+            stack.extend((x, False) for x in reversed(children))
+            continue
+
+        if len(children) == 0:
+            d_node_to_cluster[cur_node] = (d_label_to_idx[cur_node.taxon.label], 0.0, 1)
+            continue
+
+        # The height of this node is the greatest distance to a leaf
+        children_clusters = [d_node_to_cluster.pop(x) for x in children]
+        cur_height = max(x[1] + max(y.edge_length or 0.0, 0.0) for x, y in zip(children_clusters, children))
+
+        # Merge the children from left to right (a single merge if binary)
+        cluster_id, _, n_obs = children_clusters[0]
+        for right_id, _, right_n_obs in children_clusters[1:]:
+            n_obs += right_n_obs
+            rows.append((cluster_id, right_id, cur_height, n_obs))
+            cluster_id = -len(rows)
+        d_node_to_cluster[cur_node] = (cluster_id, cur_height, n_obs)
+
+    # The rows are sorted by height, a cluster is always at least as high as its
+    # children (and is processed later), so each cluster is formed after its children
+    row_order = sorted(range(len(rows)), key=lambda i: (rows[i][2], i))
+    d_row_to_cluster = {row: n_leaves + i for i, row in enumerate(row_order)}
+
+    out = np.zeros((len(rows), 4), dtype=np.float64)
+    for i, row_idx in enumerate(row_order):
+        left_id, right_id, height, n_obs = rows[row_idx]
+        left_id = d_row_to_cluster[-left_id - 1] if left_id < 0 else left_id
+        right_id = d_row_to_cluster[-right_id - 1] if right_id < 0 else right_id
+        out[i] = (left_id, right_id, height, n_obs)
     return out
 
 
-def get_leaf_to_root(tree: dendropy.Tree) -> Dict[dendropy.Node, float]:
-    out = dict()
-    queue = deque([(tree.seed_node, 0)])
-    while len(queue) > 0:
-        cur_node, cur_dist = queue.pop()
-        for child_node in cur_node.child_node_iter():
-            queue.append((child_node, cur_dist + child_node.edge_length))
-        if cur_node.is_leaf():
-            out[cur_node] = cur_dist
-    return out
-
+def create_dendrogram_plot(tree: TreeArray, y_pos, tree_taxa_ordered) -> List[go.Scatter]:
+    """
+    Creates the dendrogram of the tree as a single trace, where each line is
+    separated by a gap. The x axis is the distance from the root.
 
-def create_dendrogram_plot(tree, y_pos, tree_taxa_ordered):
+    As the nodes are in pre-order, the y coordinate of each internal node (the
+    midpoint of its children) is computed by visiting the nodes in reverse.
+    """
     d_taxon_to_y = {t: y for t, y in zip(tree_taxa_ordered, y_pos)}
-
-    trace_style = {
-        'hoverinfo': 'skip',
-        'mode': 'lines',
-        'line': go.scatter.Line(color="#0074d9")
-    }
-    traces = list()
-
-    # Determine the distance to the root for each node, this will be used
-    # to pad the x axis
-    leaf_to_root = get_leaf_to_root(tree)
-    node_coords = dict()
-
-    # Get the depth of each node, need to work up from that
-    d_depth_to_nodes = get_nodes_to_depth(tree)
-
-    for cur_depth, nodes_at_depth in sorted(d_depth_to_nodes.items(), key=lambda x: -x[0]):
-
-        # Do not process the seed node
-        if cur_depth == 0:
-            break
-
-        for cur_node in nodes_at_depth:
-
-            # If this is a leaf node, then create the line
-            if cur_node.is_leaf():
-                cur_taxon = cur_node.taxon.label
-                leaf_dist = leaf_to_root[cur_node]
-                leaf_y = d_taxon_to_y[cur_taxon]
-                x0 = leaf_dist - cur_node.edge_length
-                traces.append(go.Scatter(x=[x0, leaf_dist], y=[leaf_y, leaf_y], **trace_style))
-                node_coords[cur_node] = (x0, leaf_y)
-
-            # Otherwise, create the clade connection
-            else:
-
-                # Get the coordinates from the children
-                cur_children = cur_node.child_nodes()
-                cur_children_coords = [node_coords[x] for x in cur_children]
-
-                # Get the coordinates
-                x_coord = cur_children_coords[0][0]
-                top_y_coord = max(x[1] for x in cur_children_coords)
-                bot_y_coord = min(x[1] for x in cur_children_coords)
-
-                # Create the vertical line
-                traces.append(go.Scatter(x=[x_coord, x_coord], y=[top_y_coord, bot_y_coord], **trace_style))
-
-                # Create the horizontal line
-                horizontal_y = (top_y_coord + bot_y_coord) / 2
-                x0 = x_coord - cur_node.edge_length
-                traces.append(go.Scatter(x=[x0, x_coord], y=[horizontal_y, horizontal_y], **trace_style))
-
-                node_coords[cur_node] = (x0, horizontal_y)
-
-    # Vertical connect from the seed node
-    seed_children = tree.seed_node.child_nodes()
-    seed_children_coords = [node_coords[x] for x in seed_children]
-    x_coord = seed_children_coords[0][0]
-    top_y_coord = max(x[1] for x in seed_children_coords)
-    bot_y_coord = min(x[1] for x in seed_children_coords)
-    traces.append(go.Scatter(x=[x_coord, x_coord], y=[top_y_coord, bot_y_coord], **trace_style))
-
-    return traces
+    is_leaf = tree.is_leaf()
+    root_dist = tree.get_root_distances()
+
+    node_y = [d_taxon_to_y[x] if leaf else 0.0 for x, leaf in zip(tree.label.tolist(), is_leaf.tolist())]
+    top_y = [-np.inf] * tree.n_nodes
+    bot_y = [np.inf] * tree.n_nodes
+    for i, parent, leaf in zip(range(tree.n_nodes - 1, -1, -1), tree.parent[::-1].tolist(), is_leaf[::-1].tolist()):
+        if not leaf:
+            node_y[i] = (top_y[i] + bot_y[i]) / 2
+        if parent >= 0:
+            top_y[parent] = max(top_y[parent], node_y[i])
+            bot_y[parent] = min(bot_y[parent], node_y[i])
+    node_y, top_y, bot_y = np.array(node_y), np.array(top_y), np.array(bot_y)
+
+    # Create the vertical line connecting the children of each internal node,
+    # and the horizontal line to the parent of each node (except the root)
+    internal = np.flatnonzero(~is_leaf)
+    x_coords = interleave_lines(
+        np.concatenate((root_dist[internal], root_dist[1:] - np.nan_to_num(tree.length[1:]))),
+        np.concatenate((root_dist[internal], root_dist[1:]))
+    )
+    y_coords = interleave_lines(
+        np.concatenate((top_y[internal], node_y[1:])),
+        np.concatenate((bot_y[internal], node_y[1:]))
+    )
+
+    return [
+        go.Scatter(
+            x=x_coords,
+            y=y_coords,
+            hoverinfo='skip',
+            mode='lines',
+            line=go.scatter.Line(color="#0074d9")
+        )
+    ]
+
+
+def interleave_lines(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """
+    Returns the start and end coordinate of each line, separated by NaN (a gap).
+    An array is used as plotly validates lists element-wise, which is slow.
+    """
+    out = np.full(len(start) * 3, np.nan, dtype=np.float64)
+    out[0::3] = start
+    out[1::3] = end
+    return out
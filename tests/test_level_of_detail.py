@@ -0,0 +1,39 @@
+import networkx as nx
+
+from indizio.models.network.level_of_detail import collapse_graph, get_group_id
+
+
+def test_collapse_graph_expanded_group_within_edge_cap():
+    """The edges of an expanded group count towards the edge cap."""
+    group = [f'a{i}' for i in range(100)]
+    others = [f'b{i}' for i in range(100)]
+    graph = nx.Graph()
+    for i, node_a in enumerate(group):
+        for j, node_b in enumerate(group[i + 1:], start=i + 1):
+            graph.add_edge(node_a, node_b, value=(i + j) / 200)
+    graph.add_edges_from(zip(others, others[1:]), value=0.5)
+    graph.add_edges_from(zip(group, others), value=0.5)
+
+    out = collapse_graph(graph, [group, others], [get_group_id(group)], max_expanded_nodes=100, max_edges=500)
+
+    assert graph.subgraph(group).number_of_edges() > 500
+    assert out.number_of_edges() == 500
+    assert out.number_of_nodes() == 102
+    assert min(x['value'] for _, _, x in out.edges(data=True)) >= 0.75
+
+
+def test_collapse_graph_summaries_fill_remaining_edges():
+    """Summaries are only added for the edges remaining after those shown."""
+    group = ['a0', 'a1', 'a2']
+    graph = nx.Graph()
+    graph.add_edges_from([('a0', 'a1'), ('a1', 'a2')], value=1.0)
+    for i in range(10):
+        graph.add_edge('a0', f'b{i}', value=0.5)
+        graph.add_edge(f'b{i}', f'c{i}', value=0.5)
+    groups = [group] + [[f'b{i}', f'c{i}'] for i in range(10)]
+
+    out = collapse_graph(graph, groups, [get_group_id(group)], max_expanded_nodes=3, max_edges=5)
+
+    assert out.number_of_edges() == 5
+    assert out.has_edge('a0', 'a1') and out.has_edge('a1', 'a2')
+    assert sum('n_edges' in x for _, _, x in out.edges(data=True)) == 3